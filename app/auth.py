@@ -1,10 +1,17 @@
+import hashlib
+import time
+import uuid
 from fastapi import HTTPException
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from typing import Optional, Dict, Any
 from app.config import settings
+from app.utils.revocation import revocation_store
+from app.utils.cache import TTLCache
 
-blacklisted_tokens = set()
+# Verified payloads keyed by token digest. Each entry lives only as long as
+# the token itself, and logout evicts it, so a hit never outlives the token.
+token_cache = TTLCache(settings.TOKEN_CACHE_SIZE, settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -12,11 +19,30 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.now() + expires_delta
     else:
         expire = datetime.now() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def _token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
 def verify_token(token: str) -> Optional[Dict[str, Any]]:
+    digest = _token_digest(token)
+    cached = token_cache.get(digest)
+    if cached is not None:
+        payload, exp_timestamp = cached
+        if time.time() < exp_timestamp:
+            return dict(payload)
+        token_cache.pop(digest)
+        return None
+
+    payload = decode_token(token)
+    if payload is not None:
+        token_cache.set(digest, (payload, payload["exp"]), ttl=payload["exp"] - time.time())
+        return dict(payload)
+    return None
+
+def decode_token(token: str) -> Optional[Dict[str, Any]]:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         exp_timestamp = payload.get("exp")
@@ -30,16 +56,19 @@ def verify_token(token: str) -> Optional[Dict[str, Any]]:
     except JWTError:
         return None
     
-def is_token_blacklisted(jti: str) -> bool:
-    return jti in blacklisted_tokens
+def token_revocation_key(token: str, payload: Dict[str, Any]) -> str:
+    # Tokens issued before jti was added are revoked by their digest.
+    return payload.get("jti") or _token_digest(token)
+
+def is_token_revoked(token: str, payload: Dict[str, Any]) -> bool:
+    return revocation_store.is_revoked(token_revocation_key(token, payload))
 
-def invalidate_token(token: str) -> None:
+def invalidate_token(token: str) -> Dict[str, Any]:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        jti = payload.get("jti")  
-        if jti:
-            blacklisted_tokens.add(jti) 
-        else:
-            blacklisted_tokens.add(token)  
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    expires_at = datetime.fromtimestamp(payload["exp"], tz=timezone.utc)
+    revocation_store.revoke(token_revocation_key(token, payload), expires_at)
+    token_cache.pop(_token_digest(token))
+    return payload
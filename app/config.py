@@ -11,10 +11,67 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
     STRIPE_API_KEY: str
     PUBLISH_API_KEY: str
     FRONTEND_URL: str 
     URL: str
+    MONGO_URI: str = ""
+    PRODUCT_PAGE_LIMIT: int = 50
+    PRODUCT_STREAM_BATCH_SIZE: int = 500
+    CATALOG_CACHE_SIZE: int = 1024
+    CATALOG_CACHE_TTL_SECONDS: int = 300
+    BLOCKING_IO_WORKERS: int = 32
+    INVOICE_RENDER_WORKERS: int = 2
+    INVOICE_RENDER_TIMEOUT_SECONDS: int = 120
+    # Written by the outbox worker and served by the API: both must see the
+    # same directory (a shared volume when they run on different hosts).
+    INVOICE_DIR: str = "static/invoices"
+    SMTP_HOST: str = "smtp.gmail.com"
+    SMTP_PORT: int = 587
+    SMTP_USE_TLS: bool = True
+    SMTP_POOL_SIZE: int = 2
+    SMTP_BATCH_SIZE: int = 20
+    SMTP_MAX_RETRIES: int = 3
+    SMTP_RETRY_BACKOFF_SECONDS: float = 1.0
+    SMTP_IDLE_TIMEOUT_SECONDS: float = 60.0
+    LOW_STOCK_THRESHOLD: int = 10
+    LOW_STOCK_DIGEST_WINDOW_SECONDS: float = 300.0
+    LOW_STOCK_REALERT_SECONDS: float = 21600.0
+    OUTBOX_CONCURRENCY: int = 8
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    # A handler runs for at most the render plus send timeouts; keep that well
+    # under the lease, or a second worker reclaims the message and mails twice.
+    OUTBOX_LEASE_SECONDS: float = 300.0
+    OUTBOX_SEND_TIMEOUT_SECONDS: float = 60.0
+    OUTBOX_RETRY_BACKOFF_SECONDS: float = 5.0
+    OUTBOX_MAX_BACKOFF_SECONDS: float = 3600.0
+    REVOCATION_BACKEND: str = "mongo"
+    REVOCATION_BLOOM_CAPACITY: int = 1_000_000
+    REVOCATION_SYNC_SECONDS: float = 2.0
+    REVOCATION_REBUILD_SECONDS: float = 3600.0
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    TOKEN_CACHE_SIZE: int = 10000
+    EMPTY_CART_RETENTION_HOURS: int = 24
+    STALE_CART_RETENTION_DAYS: int = 90
+    ORDER_HISTORY_PAGE_LIMIT: int = 20
+    WRITE_ORDER_HISTORY: bool = True
+    IDEMPOTENCY_LOCK_SECONDS: float = 120.0
+    IDEMPOTENCY_WAIT_SECONDS: float = 30.0
+    IDEMPOTENCY_POLL_SECONDS: float = 0.25
+    CHECKOUT_TRANSACTIONS: bool = False
+    CHECKOUT_TRANSACTION_RETRIES: int = 5
+    CHECKOUT_MAX_LINES: int = 100
+    # Signing secret of the /stripe-webhook endpoint; webhooks get 503 until it is set.
+    STRIPE_WEBHOOK_SECRET: str = ""
+    STRIPE_EVENT_BATCH_SIZE: int = 200
+    # Also the Stripe session lifetime, which Stripe requires to be 30 minutes to 24 hours.
+    RESERVATION_TTL_MINUTES: int = 45
+    RESERVATION_SWEEP_GRACE_SECONDS: int = 300
+    RESERVATION_SWEEP_BATCH_SIZE: int = 500
 
 
     class Config:
@@ -1,117 +1,215 @@
 from fastapi import HTTPException
-from mongoengine import DoesNotExist
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from app.models.users import Buyer
-from app.models.products import Product
+from app.models.products import Product, Offer
 from app.models.carts import Cart, CartItem
-from app.schemas.cartschema import CartItemModel, CartItemUpdate, CartModel, CartResponse
+from app.schemas.cartschema import CartItemModel, CartItemUpdate, CartModel, CartResponse, CartBatchOperation
+from typing import List
 from datetime import datetime
 
-def add_to_cart(username: str, product_name: str, quantity: int):
-    buyer = Buyer.objects.get(username=username)
+# The offer window is checked against `now`, which mirrors Product.get_final_price.
+def _final_price(price: str, offer: str, now: datetime):
+    return {"$cond": [
+        {"$and": [{"$eq": [f"{offer}.is_active", True]}, {"$lt": [f"{offer}.start_date", now]}, {"$gt": [f"{offer}.end_date", now]}]},
+        {"$subtract": [price, {"$divide": [{"$multiply": [price, f"{offer}.discount_percent"]}, 100]}]},
+        price,
+    ]}
+
+def _offer_lookup(local_field: str):
+    return [
+        {"$lookup": {"from": Offer._get_collection_name(), "localField": local_field, "foreignField": "_id", "as": "offer"}},
+        {"$set": {"offer": {"$arrayElemAt": ["$offer", 0]}}},
+    ]
+
+# Prices the whole cart in one aggregation: products and their offers are
+# joined server-side.
+def price_cart(buyer: Buyer, now: datetime = None):
+    now = now or datetime.now()
+    pipeline = [
+        {"$match": {"buyer": buyer.id}},
+        {"$unwind": {"path": "$items", "includeArrayIndex": "line"}},
+        {"$lookup": {"from": Product._get_collection_name(), "localField": "items.product", "foreignField": "_id", "as": "product"}},
+        {"$unwind": "$product"},
+        *_offer_lookup("product.offer"),
+        {"$set": {"unit_price": _final_price("$product.price", "$offer", now)}},
+        {"$sort": {"line": 1}},
+        {"$group": {
+            "_id": None,
+            "items": {"$push": {"product_name": "$product.name", "quantity": "$items.quantity"}},
+            "total_price": {"$sum": {"$multiply": ["$unit_price", "$items.quantity"]}},
+        }},
+    ]
+    priced = next(Cart._get_collection().aggregate(pipeline), None)
+    if priced is None:
+        return [], 0
+    return [CartItemModel(**item) for item in priced["items"]], priced["total_price"]
+
+def _cart_response(buyer: Buyer):
+    cart_items, total_price = price_cart(buyer)
 
-    if not buyer:
+    return CartResponse(buyer_name=buyer.username, items=cart_items, total_price=total_price)
+
+def _require_buyer(buyer):
+    if not isinstance(buyer, Buyer):
         raise HTTPException(status_code=404, detail="Buyer not found")
 
-    try:
-        product = Product.objects.get(name=product_name)
-    except DoesNotExist:
+def _get_product(product_name: str):
+    product = Product.objects(name=product_name).only("id", "stock").first()
+    if product is None:
         raise HTTPException(status_code=404, detail="Product not found")
+    return product
+
+# Each mutation below is a single find_one_and_update on the buyer's cart,
+# so concurrent writes from two sessions cannot overwrite each other. Every
+# cart write bumps `version`, which apply_cart_batch uses to detect them.
+def _apply(buyer: Buyer, filter: dict, update, upsert: bool = False):
+    raw = Cart._get_collection().find_one_and_update(
+        {"buyer": buyer.id, **filter},
+        update,
+        upsert=upsert,
+        return_document=ReturnDocument.AFTER,
+    )
+    return Cart._from_son(raw) if raw is not None else None
+
+def add_to_cart(buyer: Buyer, product_name: str, quantity: int):
+    _require_buyer(buyer)
+    product = _get_product(product_name)
 
     if quantity > product.stock:
         raise HTTPException(status_code=400, detail="Not enough stock available")
 
-    cart = Cart.objects.filter(buyer=buyer).first() or Cart(buyer=buyer)
-    
-    for item in cart.items:
-        if item.product == product:
-            item.quantity += quantity
-            break
-    else:
-        new_item = CartItem(product=product, quantity=quantity)
-        cart.items.append(new_item)
-
-    cart.updated_at = datetime.now()
-    cart.save()
+    now = datetime.now()
+    items = {"$ifNull": ["$items", []]}
+    _apply(buyer, {}, [{"$set": {
+        "items": {"$cond": [
+            {"$in": [product.id, {"$map": {"input": items, "as": "item", "in": "$$item.product"}}]},
+            {"$map": {"input": items, "as": "item", "in": {"$cond": [
+                {"$eq": ["$$item.product", product.id]},
+                {"$mergeObjects": ["$$item", {"quantity": {"$add": ["$$item.quantity", quantity]}}]},
+                "$$item",
+            ]}}},
+            {"$concatArrays": [items, [{"product": product.id, "quantity": quantity}]]},
+        ]},
+        "created_at": {"$ifNull": ["$created_at", now]},
+        "updated_at": now,
+        "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+    }}], upsert=True)
 
-    cart_items = [CartItemModel(product_name=item.product.name, quantity=item.quantity) for item in cart.items]
-    total_price = cart.get_total_price()
-
-    return CartResponse(buyer_name=buyer.username, items=cart_items, total_price=total_price)
+    return _cart_response(buyer)
 
 
-def get_cart(username: str):
-    buyer = Buyer.objects.get(username=username)
+def get_cart(buyer: Buyer):
+    _require_buyer(buyer)
 
-    if not buyer:
-        raise HTTPException(status_code=404, detail="Buyer not found")
+    # Carts are created by the first write; a buyer without one simply has an empty cart.
+    return _cart_response(buyer)
 
-    cart = Cart.objects.filter(buyer=buyer).first()
-
-    if not cart:
-        cart = Cart(buyer=buyer)
-        cart.save()
 
-    cart_items = [CartItemModel(product_name=item.product.name, quantity=item.quantity) for item in cart.items]
-    total_price = cart.get_total_price()
+def update_cart_item(buyer: Buyer, product_name: str, quantity: int):
+    _require_buyer(buyer)
+    product = _get_product(product_name)
 
-    return CartResponse(buyer_name=buyer.username, items=cart_items, total_price=total_price)
-
-
-def update_cart_item(username: str, product_name: str, quantity: int):
-    buyer = Buyer.objects.get(username=username)
-
-    if not buyer:
-        raise HTTPException(status_code=404, detail="Buyer not found")
-
-    try:
-        product = Product.objects.get(name=product_name)
-    except DoesNotExist:
-        raise HTTPException(status_code=404, detail="Product not found")
+    if quantity > product.stock:
+        raise HTTPException(status_code=400, detail="Not enough stock available")
 
-    cart = Cart.objects.get(buyer=buyer)
+    cart = _apply(buyer, {"items.product": product.id}, {"$set": {"items.$.quantity": quantity, "updated_at": datetime.now()}, "$inc": {"version": 1}})
 
     if not cart:
-        raise HTTPException(status_code=404, detail="Cart not found")
-
-    for item in cart.items:
-        if item.product == product:
-            if quantity > product.stock:
-                raise HTTPException(status_code=400, detail="Not enough stock available")
-            item.quantity = quantity
-            break
-    else:
         raise HTTPException(status_code=404, detail="Item not found in cart")
 
-    cart.updated_at = datetime.now()
-    cart.save()
-
-    cart_items = [CartItemModel(product_name=item.product.name, quantity=item.quantity) for item in cart.items]
-    total_price = cart.get_total_price()
-
-    return CartResponse(buyer_name=buyer.username, items=cart_items, total_price=total_price)
-
-def remove_from_cart(username: str, product_name: str):
-    buyer = Buyer.objects.get(username=username)
-
-    if not buyer:
-        raise HTTPException(status_code=404, detail="Buyer not found")
+    return _cart_response(buyer)
 
-    try:
-        product = Product.objects.get(name=product_name)
-    except DoesNotExist:
-        raise HTTPException(status_code=404, detail="Product not found")
+def remove_from_cart(buyer: Buyer, product_name: str):
+    _require_buyer(buyer)
+    product = _get_product(product_name)
 
-    cart = Cart.objects.get(buyer=buyer)
+    cart = _apply(buyer, {}, {"$pull": {"items": {"product": product.id}}, "$set": {"updated_at": datetime.now()}, "$inc": {"version": 1}})
 
     if not cart:
         raise HTTPException(status_code=404, detail="Cart not found")
 
-    cart.items = [item for item in cart.items if item.product != product]
-
-    cart.updated_at = datetime.now()
-    cart.save()
-
-    cart_items = [CartItemModel(product_name=item.product.name, quantity=item.quantity) for item in cart.items]
-    total_price = cart.get_total_price()
-
-    return CartResponse(buyer_name=buyer.username, items=cart_items, total_price=total_price)
+    return _cart_response(buyer)
+
+CART_BATCH_RETRIES = 3
+
+# Name, stock and live unit price for the batch's products and for the
+# products already in the cart, in one aggregation.
+def _priced_products(names, product_ids, now: datetime):
+    pipeline = [
+        {"$match": {"$or": [{"name": {"$in": list(names)}}, {"_id": {"$in": list(product_ids)}}]}},
+        *_offer_lookup("offer"),
+        {"$project": {"name": 1, "stock": 1, "unit_price": _final_price("$price", "$offer", now)}},
+    ]
+    return {row["_id"]: row for row in Product._get_collection().aggregate(pipeline)}
+
+def _batch_items(items, operations: List[CartBatchOperation], product_ids):
+    quantities = {item["product"]: item["quantity"] for item in items}
+    for operation in operations:
+        product_id = product_ids[operation.product_name]
+        if operation.op == "remove":
+            quantities.pop(product_id, None)
+            continue
+        if operation.quantity is None or operation.quantity < 1:
+            raise HTTPException(status_code=400, detail=f"Quantity must be at least 1 for {operation.product_name}")
+        if operation.op == "add":
+            quantities[product_id] = quantities.get(product_id, 0) + operation.quantity
+        elif product_id in quantities:
+            quantities[product_id] = operation.quantity
+        else:
+            raise HTTPException(status_code=404, detail=f"Item not found in cart: {operation.product_name}")
+    return quantities
+
+# Applies a list of add/set/remove operations as one cart write. The new
+# item list is computed from a snapshot and written only if the cart's
+# version still matches; a concurrent change restarts from a new snapshot.
+# The response is priced from the same snapshot's product rows, so a batch
+# costs the snapshot read, one product read and the write.
+def apply_cart_batch(buyer: Buyer, operations: List[CartBatchOperation]):
+    _require_buyer(buyer)
+
+    names = {operation.product_name for operation in operations}
+    collection = Cart._get_collection()
+    now = datetime.now()
+    products = {}
+    for _ in range(CART_BATCH_RETRIES):
+        current = collection.find_one({"buyer": buyer.id}, {"items": 1, "version": 1})
+        unpriced = {item["product"] for item in current["items"]} - set(products) if current else set()
+        if not products or unpriced:
+            products.update(_priced_products(names, unpriced, now))
+
+        product_ids = {row["name"]: product_id for product_id, row in products.items()}
+        missing = sorted(names - set(product_ids))
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Product not found: {', '.join(missing)}")
+        quantities = _batch_items(current["items"] if current else [], operations, product_ids)
+
+        changed = {product_ids[name] for name in names}
+        short = [products[product_id]["name"] for product_id, quantity in quantities.items() if product_id in changed and quantity > products[product_id]["stock"]]
+        if short:
+            raise HTTPException(status_code=400, detail=f"Not enough stock available: {', '.join(short)}")
+
+        items = [{"product": product_id, "quantity": quantity} for product_id, quantity in quantities.items()]
+        if current is None:
+            try:
+                collection.insert_one({"buyer": buyer.id, "items": items, "created_at": now, "updated_at": now, "version": 0})
+            except DuplicateKeyError:
+                continue
+            break
+        # Carts written before `version` existed have none; a None filter matches the missing field.
+        result = collection.update_one(
+            {"_id": current["_id"], "version": current.get("version")},
+            {"$set": {"items": items, "updated_at": now}, "$inc": {"version": 1}},
+        )
+        if result.matched_count:
+            break
+    else:
+        raise HTTPException(status_code=409, detail="Cart was modified concurrently, please retry")
+
+    # Lines whose product was deleted are dropped, as in price_cart.
+    lines = [(products[product_id], quantity) for product_id, quantity in quantities.items() if product_id in products]
+    return CartResponse(
+        buyer_name=buyer.username,
+        items=[CartItemModel(product_name=row["name"], quantity=quantity) for row, quantity in lines],
+        total_price=sum(row["unit_price"] * quantity for row, quantity in lines),
+    )
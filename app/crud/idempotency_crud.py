@@ -0,0 +1,44 @@
+from fastapi import HTTPException
+from mongoengine import NotUniqueError
+from datetime import datetime, timedelta
+from app.models.idempotency import IdempotencyRecord
+from app.models.users import Buyer
+from app.config import settings
+
+# Claims (buyer, key) for this request. Returns None when the caller now
+# owns the key and should run the request, otherwise the existing record:
+# completed ones are replayed, in-progress ones are waited on.
+def begin_request(buyer: Buyer, key: str, request_hash: str):
+    now = datetime.utcnow()
+    locked_until = now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+    try:
+        IdempotencyRecord(buyer=buyer, key=key, request_hash=request_hash, locked_until=locked_until).save()
+        return None
+    except NotUniqueError:
+        pass
+
+    record = IdempotencyRecord.objects(buyer=buyer, key=key).first()
+    if record is None:
+        # Deleted by a failed attempt in the meantime; try to claim it again.
+        return begin_request(buyer, key, request_hash)
+    if record.request_hash != request_hash:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    if record.status == "in_progress" and record.locked_until < now:
+        # The first attempt died without finishing; take over its key.
+        taken = IdempotencyRecord.objects(id=record.id, status="in_progress", locked_until=record.locked_until).update_one(set__locked_until=locked_until)
+        if taken:
+            return None
+    return record
+
+def get_request(buyer: Buyer, key: str):
+    return IdempotencyRecord.objects(buyer=buyer, key=key).first()
+
+def complete_request(buyer: Buyer, key: str, status_code: int, response: dict):
+    IdempotencyRecord.objects(buyer=buyer, key=key).update_one(
+        set__status="completed",
+        set__status_code=status_code,
+        set__response=response,
+    )
+
+def abandon_request(buyer: Buyer, key: str):
+    IdempotencyRecord.objects(buyer=buyer, key=key, status="in_progress").delete()
@@ -0,0 +1,95 @@
+from uuid import uuid4
+from datetime import datetime
+from pymongo import UpdateOne
+from app.models.products import Product
+
+def _aggregate_lines(lines):
+    quantities = {}
+    products = {}
+    for product, quantity in lines:
+        quantities[product.id] = quantities.get(product.id, 0) + quantity
+        products[product.id] = product
+    return quantities, products
+
+def _reserved_product_ids(reservation_id: str, session=None):
+    cursor = Product._get_collection().find({"reservations.reservation_id": reservation_id}, {"_id": 1}, session=session)
+    return {document["_id"] for document in cursor}
+
+def reserve_stock(lines, reservation_id: str = None, expires_at: datetime = None, session=None):
+    reservation_id = reservation_id or uuid4().hex
+    quantities, products = _aggregate_lines(lines)
+    if not quantities:
+        return reservation_id
+
+    now = datetime.now()
+    operations = [
+        UpdateOne(
+            {"_id": product_id, "stock": {"$gte": quantity}},
+            {
+                "$inc": {"stock": -quantity},
+                "$push": {"reservations": {
+                    "reservation_id": reservation_id,
+                    "quantity": quantity,
+                    "expires_at": expires_at,
+                    "created_at": now,
+                }},
+            },
+        )
+        for product_id, quantity in quantities.items()
+    ]
+    result = Product._get_collection().bulk_write(operations, ordered=False, session=session)
+    if result.modified_count == len(operations):
+        return reservation_id
+
+    reserved = _reserved_product_ids(reservation_id, session=session)
+    release_reservation(reservation_id, session=session)
+    unavailable = [products[product_id].name for product_id in quantities if product_id not in reserved]
+    raise ValueError(f"Not enough stock available for: {', '.join(unavailable)}")
+
+def release_reservation(reservation_id: str, session=None):
+    return release_reservations([reservation_id], session=session)
+
+def release_reservations(reservation_ids, session=None):
+    reservation_ids = list(reservation_ids)
+    if not reservation_ids:
+        return 0
+    collection = Product._get_collection()
+    operations = []
+    for document in collection.find({"reservations.reservation_id": {"$in": reservation_ids}}, {"reservations": 1}, session=session):
+        for hold in document["reservations"]:
+            if hold["reservation_id"] not in reservation_ids:
+                continue
+            # Matching on the hold keeps the release idempotent if two callers race.
+            operations.append(UpdateOne(
+                {"_id": document["_id"], "reservations.reservation_id": hold["reservation_id"]},
+                {
+                    "$inc": {"stock": hold["quantity"]},
+                    "$pull": {"reservations": {"reservation_id": hold["reservation_id"]}},
+                },
+            ))
+    if not operations:
+        return 0
+    return collection.bulk_write(operations, ordered=False, session=session).modified_count
+
+def commit_reservation(reservation_id: str, session=None):
+    return commit_reservations([reservation_id], session=session)
+
+def commit_reservations(reservation_ids, session=None):
+    reservation_ids = list(reservation_ids)
+    if not reservation_ids:
+        return 0
+    result = Product._get_collection().update_many(
+        {"reservations.reservation_id": {"$in": reservation_ids}},
+        {"$pull": {"reservations": {"reservation_id": {"$in": reservation_ids}}}},
+        session=session,
+    )
+    return result.modified_count
+
+def expired_reservation_ids(cutoff: datetime):
+    cursor = Product._get_collection().find({"reservations.expires_at": {"$lt": cutoff}}, {"reservations": 1})
+    return {
+        hold["reservation_id"]
+        for document in cursor
+        for hold in document["reservations"]
+        if hold.get("expires_at") is not None and hold["expires_at"] < cutoff
+    }
@@ -1,26 +1,141 @@
 from fastapi import HTTPException
-from mongoengine import DoesNotExist
+from mongoengine import DoesNotExist, Q
 from app.models.users import Buyer
 from app.models.products import Product
 from app.models.carts import Cart, CartItem
-from app.schemas.orderschema import OrderCreate, OrderResponse, Order_Response, OrderItem, DeliveryAddress, SellerInfo, PaymentMethod, PaymentStatus, ChargeResponse
+from app.schemas.orderschema import OrderCreate, OrderResponse, Order_Response, OrderPage, OrderItem, DeliveryAddress, SellerInfo, PaymentMethod, PaymentStatus, ChargeResponse
 from app.models.coupon import Coupon
-from datetime import datetime
+from datetime import datetime, timedelta
 from app.models.users import Buyer
 from app.models.carts import Cart
-from app.models.order import Order, OrderHistory, Charge
-from app.utils.invoice import send_low_stock_email
+from app.models.order import Order, OrderHistory, Charge, OrderLine, SellerSnapshot
+from app.utils.dereference import resolve_references
+from app.crud.inventory_crud import reserve_stock, release_reservation, commit_reservation
+from app.crud.outbox_crud import enqueue_order_notifications, enqueue_low_stock_check
+from app.models.outbox import OutboxMessage
 from decimal import Decimal
+from bson import ObjectId
+from bson.errors import InvalidId
+from typing import Optional
 import stripe
 from app.config import settings
+from app.database import run_in_transaction
+import logging
+
+logger = logging.getLogger(__name__)
 
 stripe.api_key = settings.STRIPE_API_KEY
 
-async def create_order_logic(order_data: OrderCreate, current_buyer: Buyer):
+def _create_checkout_session(final_price: Decimal, expires_at: datetime):
+    try:
+        return stripe.checkout.Session.create(
+            payment_method_types=["card"],
+            line_items=[
+                {
+                    "price_data": {
+                        "currency": "inr",
+                        "product_data": {
+                            "name": "Your Product Name", 
+                        },
+                        "unit_amount": int(final_price * 100),  
+                    },
+                    "quantity": 1,
+                },
+            ],
+            mode="payment",
+            success_url=f"{settings.URL}/payment-success?session_id={{CHECKOUT_SESSION_ID}}",
+            cancel_url=f"{settings.URL}/payment-cancel",
+            expires_at=int(expires_at.timestamp()),
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Stripe Payment Failed: {str(e)}")
+
+def snapshot_order_line(product: Product, quantity: int):
+    seller = product.seller
+    return OrderLine(
+        product=product,
+        quantity=quantity,
+        product_name=product.name,
+        unit_price=product.price,
+        final_price=product.get_final_price(),
+        seller=SellerSnapshot(
+            seller_name=seller.full_name,
+            seller_contact=seller.phone_no,
+            store_name=seller.store_name,
+            store_location=seller.store_address
+        )
+    )
+
+def _expire_checkout_session(checkout_session):
+    if checkout_session is None:
+        return
+    try:
+        stripe.checkout.Session.expire(checkout_session.id)
+    except Exception as e:
+        logger.warning(f"Could not expire checkout session {checkout_session.id}: {e}")
+
+def _insert(document, session=None):
+    document.validate()
+    result = type(document)._get_collection().insert_one(document.to_mongo(), session=session)
+    document.id = result.inserted_id
+    return document
+
+# Every checkout write. With a session the caller runs this inside a
+# transaction and a failure rolls everything back; without one, the writes
+# that already landed are undone by _undo_order. Online orders keep their
+# hold until the payment outcome arrives or the hold expires.
+def _place_order(order: Order, cart: Cart, coupon: Coupon, session=None):
+    buyer = order.buyer
+    order.reservation_id = reserve_stock(
+        [(item.product, item.quantity) for item in order.items],
+        expires_at=order.reservation_expires_at,
+        session=session
+    )
+    try:
+        _insert(order, session=session)
+
+        if coupon and coupon.is_single_use:
+            Coupon._get_collection().update_one({"_id": coupon.id}, {"$addToSet": {"used_by": buyer.id}}, session=session)
+
+        if settings.WRITE_ORDER_HISTORY:
+            _insert(OrderHistory(order=order, buyer=buyer), session=session)
+
+        enqueue_low_stock_check(str(order.id), session=session)
+
+        Cart._get_collection().update_one({"_id": cart.id}, {"$set": {"items": [], "updated_at": datetime.now()}, "$inc": {"version": 1}}, session=session)
+
+        # Last: once the hold is committed the stock can no longer be handed back by an undo.
+        if order.payment_method == PaymentMethod.COD:
+            enqueue_order_notifications(str(order.id), session=session)
+            commit_reservation(order.reservation_id, session=session)
+    except Exception:
+        if session is None:
+            _undo_order(order, cart, coupon)
+        raise
+
+# Best-effort compensation for a non-transactional checkout that failed part
+# way. Every step is safe to run whether or not the matching write landed.
+def _undo_order(order: Order, cart: Cart, coupon: Coupon):
+    try:
+        release_reservation(order.reservation_id)
+        if order.id is not None:
+            OutboxMessage.objects(payload__order_id=str(order.id)).delete()
+            OrderHistory.objects(order=order.id).delete()
+            Order.objects(id=order.id).delete()
+        if coupon and coupon.is_single_use:
+            Coupon._get_collection().update_one({"_id": coupon.id}, {"$pull": {"used_by": order.buyer.id}})
+        Cart._get_collection().update_one(
+            {"_id": cart.id, "items": []},
+            {"$set": {"items": [item.to_mongo() for item in cart.items], "updated_at": datetime.now()}, "$inc": {"version": 1}},
+        )
+    except Exception as e:
+        logger.error(f"Could not undo partially placed order {order.id} (reservation {order.reservation_id}): {e}")
+
+def create_order_logic(order_data: OrderCreate, current_buyer: Buyer):
     buyer = current_buyer
-    cart = Cart.objects.get(buyer=buyer)
+    cart = Cart.objects(buyer=buyer).first()
 
-    if not cart.items:
+    if not cart or not cart.items:
         raise HTTPException(status_code=400, detail="Cart is empty")
 
     if order_data.delivery_address_index is not None:
@@ -32,6 +147,8 @@ async def create_order_logic(order_data: OrderCreate, current_buyer: Buyer):
         if not delivery_address:
             raise HTTPException(status_code=400, detail="No primary address found")
 
+    # Live reads: the buyer is charged what price_cart showed them, not a cached offer.
+    resolve_references(cart.items, "product", "product.seller", "product.offer", cached=False)
     total_price = cart.get_total_price()
     final_price = total_price
     coupon = None
@@ -44,93 +161,105 @@ async def create_order_logic(order_data: OrderCreate, current_buyer: Buyer):
                     raise HTTPException(status_code=400, detail="Total price is less than minimum order value")
                 discount = coupon.apply_discount(total_price)
                 final_price = max(Decimal(0), total_price - discount)
-
-                if coupon.is_single_use and buyer not in coupon.used_by:
-                    coupon.used_by.append(buyer)
-                    coupon.save()
             else:
                 raise HTTPException(status_code=400, detail="Coupon is not valid for this buyer or has expired")
         except DoesNotExist:
             raise HTTPException(status_code=404, detail="Coupon not found")
 
+    if len(cart.items) > settings.CHECKOUT_MAX_LINES:
+        raise HTTPException(status_code=400, detail=f"Orders are limited to {settings.CHECKOUT_MAX_LINES} lines")
+
     order = Order(
         buyer=buyer,
-        items=cart.items,
+        buyer_name=buyer.full_name,
+        items=[snapshot_order_line(item.product, item.quantity) for item in cart.items],
         total_price=total_price,
         final_price=final_price,
         payment_method=order_data.payment_method,
+        payment_status=PaymentStatus.PENDING,
         delivery_address=delivery_address,
-        coupon=coupon
+        coupon=coupon,
+        coupon_code=coupon.code if coupon else None
     )
 
+    # Created before any write so a retried transaction never opens a second session.
     checkout_session = None
     if order_data.payment_method == PaymentMethod.ONLINE:
-        try:
-            checkout_session = stripe.checkout.Session.create(
-                payment_method_types=["card"],
-                line_items=[
-                    {
-                        "price_data": {
-                            "currency": "inr",
-                            "product_data": {
-                                "name": "Your Product Name", 
-                            },
-                            "unit_amount": int(final_price * 100),  
-                        },
-                        "quantity": 1,
-                    },
-                ],
-                mode="payment",
-                success_url=f"{settings.URL}/payment-success?session_id={{CHECKOUT_SESSION_ID}}",
-                cancel_url=f"{settings.URL}/payment-cancel",
-            )
-            
-            order.charge = Charge(
-                stripe_checkout_id=checkout_session.id if checkout_session.id else None,  
-                amount=final_price
-            )
-            order.payment_status = PaymentStatus.PENDING  
-        except Exception as e:
-            order.payment_status = PaymentStatus.FAILED
-            raise HTTPException(status_code=400, detail=f"Stripe Payment Failed: {str(e)}")
-    else:
-        order.payment_status = PaymentStatus.PENDING
+        order.reservation_expires_at = datetime.now() + timedelta(minutes=settings.RESERVATION_TTL_MINUTES)
+        checkout_session = _create_checkout_session(final_price, order.reservation_expires_at)
+        order.charge = Charge(
+            stripe_checkout_id=checkout_session.id if checkout_session.id else None,  
+            amount=final_price
+        )
 
-    order.save()
+    try:
+        if settings.CHECKOUT_TRANSACTIONS:
+            run_in_transaction(lambda session: _place_order(order, cart, coupon, session), settings.CHECKOUT_TRANSACTION_RETRIES)
+        else:
+            _place_order(order, cart, coupon)
+    except ValueError as e:
+        _expire_checkout_session(checkout_session)
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        _expire_checkout_session(checkout_session)
+        raise
 
-    for item in cart.items:
-        product = item.product
-        try:
-            product.reduce_stock(item.quantity)
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
-        if product.stock < 10:
-            send_low_stock_email(product.seller.email, product.name)
+    order_response = build_order_response(
+        order,
+        buyer_name=current_buyer.full_name,
+        response_model=Order_Response,
+        payment_url=checkout_session.url if checkout_session else None,
+        invoice_id=str(order.id) if order.payment_method == PaymentMethod.COD else None
+    )
+
+    return order_response
+
+def get_buyer_order(order_id: str, buyer: Buyer):
+    if not ObjectId.is_valid(order_id):
+        raise HTTPException(status_code=404, detail="Order not found")
+    order = Order.objects(id=order_id, buyer=buyer).first()
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order
 
-    OrderHistory(order=order, buyer=buyer).save()
+def _order_item(item: OrderLine):
+    if item.product_name is not None:
+        return OrderItem(
+            product_name=item.product_name,
+            quantity=item.quantity,
+            price=item.final_price,
+            seller=SellerInfo(
+                seller_name=item.seller.seller_name,
+                seller_contact=item.seller.seller_contact,
+                store_name=item.seller.store_name,
+                store_location=item.seller.store_location
+            )
+        )
+    # Orders placed before line snapshots existed still read the live product.
+    return OrderItem(
+        product_name=item.product.name,
+        quantity=item.quantity,
+        price=item.product.price,
+        seller=SellerInfo(
+            seller_name=item.product.seller.full_name,
+            seller_contact=item.product.seller.phone_no,
+            store_name=item.product.seller.store_name,
+            store_location=item.product.seller.store_address
+        )
+    )
 
-    cart.clear_cart()
+def _order_items(order: Order):
+    return [_order_item(item) for item in order.items]
 
-    order_response = Order_Response(
+def build_order_response(order: Order, buyer_name: str, response_model=OrderResponse, **extra):
+    return response_model(
         order_id=str(order.id),
-        buyer_name=current_buyer.full_name,
-        items=[
-            OrderItem(
-                product_name=item.product.name,
-                quantity=item.quantity,
-                price=item.product.price,
-                seller=SellerInfo(
-                    seller_name=item.product.seller.full_name,
-                    seller_contact=item.product.seller.phone_no,
-                    store_name=item.product.seller.store_name,
-                    store_location=item.product.seller.store_address
-                )
-            ) for item in order.items
-        ],
+        buyer_name=buyer_name,
+        items=_order_items(order),
         total_price=order.total_price,
         final_price=order.final_price,
-        coupon_code=order_data.coupon_code,  
-        payment_method=order_data.payment_method,
+        coupon_code=order.coupon_code or (order.coupon.code if order.coupon else None),
+        payment_method=order.payment_method,
         payment_status=order.payment_status,
         delivery_address=DeliveryAddress(
             address_line1=order.delivery_address.address_line1,
@@ -146,60 +275,38 @@ async def create_order_logic(order_data: OrderCreate, current_buyer: Buyer):
             stripe_charge_id=order.charge.stripe_charge_id if order.charge else None,
             created_at=order.charge.created_at if order.charge else None,
         ) if order.charge else None,
-        payment_url= checkout_session.url if checkout_session else None
+        **extra
     )
 
-    return order_response
-
-def retrieve_order_history(current_buyer: Buyer):
-    order_history = OrderHistory.objects.filter(buyer=current_buyer).all()
-
-    if not order_history:
-        raise ValueError("No order history found")
+def resolve_order_references(orders):
+    resolve_references([order for order in orders if order.coupon_code is None], "coupon")
+    resolve_references([item for order in orders for item in order.items if item.product_name is None], "product", "product.seller")
+    return orders
 
-    order_history_response = []  
-    
-    for history in order_history:
-        order = history.order
-        
-        order_response = OrderResponse(
-            order_id=str(order.id),
-            buyer_name=current_buyer.full_name,
-            items=[
-                OrderItem(
-                    product_name=item.product.name,
-                    quantity=item.quantity,
-                    price=item.product.price,
-                    seller=SellerInfo(
-                        seller_name=item.product.seller.full_name,
-                        seller_contact=item.product.seller.phone_no,
-                        store_name=item.product.seller.store_name,
-                        store_location=item.product.seller.store_address
-                    )
-                ) for item in order.items
-            ],
-            total_price=order.total_price,
-            coupon_code= order.coupon.code if order.coupon else None,
-            final_price=order.final_price,  
-            payment_method=order.payment_method,
-            payment_status=order.payment_status,
-            delivery_address=DeliveryAddress(
-                address_line1=order.delivery_address.address_line1,
-                address_line2=order.delivery_address.address_line2,
-                city=order.delivery_address.city,
-                state=order.delivery_address.state,
-                postal_code=order.delivery_address.postal_code,
-                country=order.delivery_address.country
-            ),
-            order_date=order.order_at,
-            charge=ChargeResponse(
-                amount=order.charge.amount if order.charge else Decimal(0.0),
-                stripe_charge_id=order.charge.stripe_charge_id if order.charge else None,
-                created_at=order.charge.created_at if order.charge else None,
-            ) if order.charge else None
-        )
+def _history_cursor(after: str):
+    order_at, _, order_id = after.rpartition("_")
+    try:
+        return datetime.fromisoformat(order_at), ObjectId(order_id)
+    except (ValueError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-        order_history_response.append(order_response)
+# Keyset pagination over (order_at desc, _id desc), served by the
+# (buyer, -order_at, -_id) index; the id breaks ties between orders placed
+# in the same millisecond.
+def retrieve_order_history(current_buyer: Buyer, limit: int = settings.ORDER_HISTORY_PAGE_LIMIT, after: Optional[str] = None):
+    query = Order.objects(buyer=current_buyer)
+    if after:
+        order_at, order_id = _history_cursor(after)
+        query = query.filter(Q(order_at__lt=order_at) | Q(order_at=order_at, id__lt=order_id))
 
-    return order_history_response
+    # Fetch one extra document to know whether another page exists.
+    orders = resolve_order_references(list(query.order_by("-order_at", "-id").limit(limit + 1)))
+    next_cursor = None
+    if len(orders) > limit:
+        last = orders[limit - 1]
+        next_cursor = f"{last.order_at.isoformat()}_{last.id}"
 
+    return OrderPage(
+        items=[build_order_response(order, buyer_name=order.buyer_name or current_buyer.full_name) for order in orders[:limit]],
+        next_cursor=next_cursor
+    )
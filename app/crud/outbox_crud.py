@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from app.models.outbox import OutboxMessage
+
+def order_notifications(order_id: str):
+    payload = {"order_id": order_id}
+    return [
+        OutboxMessage(kind="order_invoice_email", payload=payload),
+        OutboxMessage(kind="order_sms", payload=payload),
+    ]
+
+def _enqueue(messages, session=None):
+    if session is None:
+        return OutboxMessage.objects.insert(messages)
+    OutboxMessage._get_collection().insert_many([message.to_mongo() for message in messages], session=session)
+    return messages
+
+def enqueue_order_notifications(order_id: str, session=None):
+    return _enqueue(order_notifications(order_id), session=session)
+
+def enqueue_orders_notifications(order_ids):
+    return _enqueue([message for order_id in order_ids for message in order_notifications(order_id)])
+
+def enqueue_low_stock_check(order_id: str, session=None):
+    return _enqueue([OutboxMessage(kind="low_stock_check", payload={"order_id": order_id})], session=session)
+
+def claim_next_message(lease_seconds: float):
+    now = datetime.now()
+    raw = OutboxMessage._get_collection().find_one_and_update(
+        {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            # A worker that died mid-message leaves it processing; reclaim once its lease lapses.
+            {"status": "processing", "locked_until": {"$lt": now}},
+        ]},
+        {
+            "$set": {"status": "processing", "locked_until": now + timedelta(seconds=lease_seconds)},
+            "$inc": {"attempts": 1},
+        },
+        sort=[("next_attempt_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+    return OutboxMessage._from_son(raw) if raw else None
+
+def retry_delay(attempts: int, backoff_seconds: float, max_backoff_seconds: float) -> float:
+    return min(max_backoff_seconds, backoff_seconds * 2 ** (attempts - 1))
+
+# Only the worker still holding the lease may settle a message. If the lease
+# lapsed and another worker reclaimed it, `locked_until` and `attempts` have
+# moved on and these updates match nothing.
+def _owned(message: OutboxMessage):
+    return OutboxMessage.objects(
+        id=message.id, status="processing", locked_until=message.locked_until, attempts=message.attempts
+    )
+
+def mark_done(message: OutboxMessage) -> bool:
+    return _owned(message).update_one(
+        set__status="done", set__completed_at=datetime.now(), unset__locked_until=True, unset__last_error=True
+    ) == 1
+
+def mark_failed(message: OutboxMessage, error: str, max_attempts: int, backoff_seconds: float, max_backoff_seconds: float):
+    if message.attempts >= max_attempts:
+        updated = _owned(message).update_one(
+            set__status="dead", set__last_error=error, unset__locked_until=True
+        )
+        return "dead" if updated else "lost"
+
+    delay = retry_delay(message.attempts, backoff_seconds, max_backoff_seconds)
+    updated = _owned(message).update_one(
+        set__status="pending",
+        set__last_error=error,
+        set__next_attempt_at=datetime.now() + timedelta(seconds=delay),
+        unset__locked_until=True
+    )
+    return "pending" if updated else "lost"
+
+def outbox_stats():
+    counts = {status: 0 for status in ("pending", "processing", "done", "dead")}
+    for row in OutboxMessage.objects.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+        counts[row["_id"]] = row["count"]
+    return counts
@@ -0,0 +1,148 @@
+import logging
+from datetime import datetime
+from uuid import uuid4
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.models.order import Order
+from app.models.payments import StripeEvent
+from app.schemas.orderschema import PaymentStatus
+from app.crud.outbox_crud import enqueue_orders_notifications
+from app.crud.inventory_crud import commit_reservations, release_reservations, expired_reservation_ids
+
+logger = logging.getLogger(__name__)
+
+# Checkout session events and the order status each one settles on.
+EVENT_OUTCOMES = {
+    "checkout.session.completed": None,
+    "checkout.session.async_payment_succeeded": PaymentStatus.SUCCEEDED,
+    "checkout.session.async_payment_failed": PaymentStatus.FAILED,
+    "checkout.session.expired": PaymentStatus.FAILED,
+}
+
+def record_stripe_event(event) -> bool:
+    session = event["data"]["object"]
+    try:
+        StripeEvent._get_collection().insert_one({
+            "event_id": event["id"],
+            "type": event["type"],
+            "checkout_session_id": session.get("id") if event["type"] in EVENT_OUTCOMES else None,
+            "payload": {"payment_status": session.get("payment_status"), "created": event.get("created")},
+            "status": "pending",
+            "received_at": datetime.now(),
+        })
+    except DuplicateKeyError:
+        # Stripe delivers at least once; a redelivery is already queued or applied.
+        return False
+    return True
+
+def event_outcome(event: StripeEvent):
+    if event.type not in EVENT_OUTCOMES or not event.checkout_session_id:
+        return None
+    if event.type == "checkout.session.completed":
+        # Delayed payment methods complete the session before the money arrives.
+        return PaymentStatus.SUCCEEDED if event.payload.get("payment_status") == "paid" else None
+    return EVENT_OUTCOMES[event.type]
+
+# Folds a batch of events, oldest first, into one outcome per checkout
+# session. Returns the outcomes plus the event ids that fed them and the
+# ids of events that settle nothing.
+def fold_events(events):
+    outcomes = {}
+    applied, ignored = [], []
+    for event in events:
+        outcome = event_outcome(event)
+        if outcome is None:
+            ignored.append(event.id)
+            continue
+        # A later event for the same session wins.
+        outcomes[event.checkout_session_id] = outcome
+        applied.append(event.id)
+    return outcomes, applied, ignored
+
+def pending_stripe_events(limit: int):
+    return list(StripeEvent.objects(status="pending").order_by("received_at").limit(limit))
+
+def mark_events_processed(applied_ids, ignored_ids):
+    now = datetime.now()
+    if applied_ids:
+        StripeEvent.objects(id__in=applied_ids).update(set__status="applied", set__applied_at=now)
+    if ignored_ids:
+        StripeEvent.objects(id__in=ignored_ids).update(set__status="ignored", set__applied_at=now)
+
+# Moves pending orders to their final payment status. `outcomes` maps a
+# Stripe checkout session id to "succeeded" or "failed". All transitions go
+# in one bulk_write of pending-guarded updates, each stamping `settled_by`
+# with a token unique to this call. One find on that token then returns the
+# orders this call moved, and only those get notifications and have their
+# hold settled. That is why the webhook worker, the reconciler and the
+# sweeper can overlap safely.
+#
+# A success for an order that already failed is flagged for review by a
+# second update in the same batch. The buyer paid for an order whose stock
+# may be gone, so it cannot be settled automatically. The batch is ordered,
+# so that update only matches when the pending one before it did not.
+def apply_payment_outcomes(outcomes: dict):
+    counts = {"succeeded": 0, "failed": 0, "unchanged": len(outcomes)}
+    if not outcomes:
+        return counts
+    token = uuid4().hex
+    operations = []
+    for checkout_id, outcome in outcomes.items():
+        status = PaymentStatus(outcome)
+        operations.append(UpdateOne(
+            {"charge.stripe_checkout_id": checkout_id, "payment_status": PaymentStatus.PENDING.value},
+            {"$set": {"payment_status": status.value, "settled_by": token}},
+        ))
+        if status == PaymentStatus.SUCCEEDED:
+            operations.append(UpdateOne(
+                {"charge.stripe_checkout_id": checkout_id, "payment_status": PaymentStatus.FAILED.value, "payment_review": None},
+                {"$set": {"payment_review": "paid_after_failure", "settled_by": token}},
+            ))
+    collection = Order._get_collection()
+    collection.bulk_write(operations, ordered=True)
+
+    paid_holds, failed_holds, paid_orders = [], [], []
+    for document in collection.find(
+        {"charge.stripe_checkout_id": {"$in": list(outcomes)}, "settled_by": token},
+        {"reservation_id": 1, "payment_status": 1, "payment_review": 1, "charge.stripe_checkout_id": 1},
+    ):
+        if document.get("payment_review") == "paid_after_failure" and document["payment_status"] == PaymentStatus.FAILED.value:
+            logger.error(f"Order {document['_id']} was paid after it failed (checkout session {document['charge']['stripe_checkout_id']}); flagged for review")
+            continue
+        counts[document["payment_status"]] += 1
+        counts["unchanged"] -= 1
+        if document["payment_status"] == PaymentStatus.SUCCEEDED.value:
+            paid_holds.append(document.get("reservation_id"))
+            paid_orders.append(str(document["_id"]))
+        else:
+            failed_holds.append(document.get("reservation_id"))
+    if paid_orders:
+        enqueue_orders_notifications(paid_orders)
+    # Paid orders keep their stock for good; failed ones hand it back.
+    commit_reservations([hold for hold in paid_holds if hold])
+    release_reservations([hold for hold in failed_holds if hold])
+    return counts
+
+# Settles stock holds that ran out before `cutoff` without their order
+# settling them: holds with no order behind them (left by a checkout that
+# crashed) or whose order failed are released, and holds whose order was
+# paid are committed. Holds of pending orders are left to the sweeper,
+# which asks the payment provider first.
+def settle_orphaned_holds(cutoff: datetime):
+    expired_holds = expired_reservation_ids(cutoff)
+    if not expired_holds:
+        return {"holds_released": 0, "holds_committed": 0}
+    owners = {
+        document["reservation_id"]: document["payment_status"]
+        for document in Order._get_collection().find(
+            {"reservation_id": {"$in": list(expired_holds)}}, {"reservation_id": 1, "payment_status": 1}
+        )
+    }
+    orphaned = [hold for hold in expired_holds if owners.get(hold, PaymentStatus.FAILED.value) == PaymentStatus.FAILED.value]
+    paid = [hold for hold in expired_holds if owners.get(hold) == PaymentStatus.SUCCEEDED.value]
+    release_reservations(orphaned)
+    commit_reservations(paid)
+    return {"holds_released": len(orphaned), "holds_committed": len(paid)}
+
+def get_order_by_checkout_session(session_id: str):
+    return Order.objects(charge__stripe_checkout_id=session_id).first()
@@ -1,34 +1,48 @@
 from fastapi import HTTPException
 from mongoengine import DoesNotExist
+from bson import ObjectId
+from typing import Optional
 from app.models.users import Seller
 from app.models.products import Product, Brand, Category, Offer
-from app.schemas.productschema import BrandResponse, ProductUpdate, ProductBase, OfferBase, OfferUpdate, ProductResponse
+from app.schemas.productschema import BrandResponse, ProductUpdate, ProductBase, OfferBase, OfferUpdate, ProductResponse, ProductPage
+from app.config import settings
+from app.utils.dereference import resolve_references
+from app.utils.catalog_cache import catalog_cache
+
+PRODUCT_REFERENCES = ("category", "brand", "seller", "offer")
 
 def create_brand(name: str):
     if Brand.objects.filter(name=name).first():
         raise HTTPException(status_code=400, detail="Brand with this name already exists")
     brand = Brand(name=name)
     brand.save()
+    catalog_cache.put(brand)
     return brand
 
 def get_brands():
-    brands=Brand.objects.all()
+    brands=list(Brand.objects.all())
     return brands
 
 def get_brand(name: str):
     try:
-        return Brand.objects.get(name=name)
+        return catalog_cache.get_by_name(Brand, name)
     except DoesNotExist:
         raise HTTPException(status_code=404, detail="Brand not found")
 
 def update_brand(name: str, new_name: str):
-    brand = get_brand(name)
+    try:
+        brand = Brand.objects.get(name=name)
+    except DoesNotExist:
+        raise HTTPException(status_code=404, detail="Brand not found")
+    catalog_cache.invalidate(brand)
     brand.name = new_name
     brand.save()
+    catalog_cache.put(brand)
     return brand
 
 def delete_brand(name: str):
     brand = get_brand(name)
+    catalog_cache.invalidate(brand)
     brand.delete()
     return {"message": "Brand deleted"}
 
@@ -39,7 +53,7 @@ def create_category(category_data: Category):
     parent_category = None
     if category_data.parent_name:
         try:
-            parent_category = Category.objects.get(name=category_data.parent_name)
+            parent_category = catalog_cache.get_by_name(Category, category_data.parent_name)
         except Category.DoesNotExist:
             raise HTTPException(status_code=404, detail="Parent category not found")
 
@@ -48,42 +62,59 @@ def create_category(category_data: Category):
         parent=parent_category
     )
     new_category.save()
+    catalog_cache.put(new_category)
     return new_category
 
 def get_category(name: str):
     try:
-        return Category.objects.get(name=name)
+        return catalog_cache.get_by_name(Category, name)
     except DoesNotExist:
         raise HTTPException(status_code=404, detail="Category not found")
     
 def get_categories():
-    categories = Category.objects.all() 
+    categories = resolve_references(Category.objects.all(), "parent")
     return categories
 
+def get_category_responses():
+    return [build_category_response(category) for category in get_categories()]
+
+def build_category_response(category: Category):
+    resolve_references([category], "parent")
+    return {
+        "name": category.name,
+        "parent_name": category.parent.name if category.parent else None
+    }
+
 def update_category(name: str, new_name: str, parent_name: str = None):
-    category = get_category(name)
-    
+    try:
+        category = Category.objects.get(name=name)
+    except DoesNotExist:
+        raise HTTPException(status_code=404, detail="Category not found")
+
     parent_category = None
     if parent_name:
         try:
-            parent_category = Category.objects.get(name=parent_name)
+            parent_category = catalog_cache.get_by_name(Category, parent_name)
         except DoesNotExist:
             raise HTTPException(status_code=404, detail="Parent category not found")
     
+    catalog_cache.invalidate(category)
     category.name = new_name
     category.parent = parent_category
     category.save()
+    catalog_cache.put(category)
     return category
 
 def delete_category(name: str):
     category = get_category(name)
+    catalog_cache.invalidate(category)
     category.delete()
     return {"message": "Category deleted"}
 
 def create_product(product_data: ProductBase):
     try:
-        category = Category.objects.get(name=product_data.category_name)
-        brand = Brand.objects.get(name=product_data.brand_name)
+        category = catalog_cache.get_by_name(Category, product_data.category_name)
+        brand = catalog_cache.get_by_name(Brand, product_data.brand_name)
         seller = Seller.objects.get(username=product_data.seller_name)  
     except DoesNotExist:
         raise HTTPException(status_code=404, detail="Category, Brand, or Seller not found")
@@ -108,17 +139,52 @@ def create_product(product_data: ProductBase):
     product.save()
     return product
 
-def get_products():
-    products=Product.objects.all()
-    return [ProductResponse(name=product.name,
+def build_product_response(product: Product):
+    # A no-op for pages, which resolve the whole batch up front.
+    resolve_references([product], *PRODUCT_REFERENCES)
+    return ProductResponse(
+        name=product.name,
         description=product.description,
         price=product.price,
         stock=product.stock,
-        category_name=product.category.name, 
+        category_name=product.category.name,
         brand_name=product.brand.name,
         seller_name=product.seller.username,
         final_price=product.get_final_price(),
-        offer_name=product.offer.name if product.offer else None ) for product in products]
+        offer_name=product.offer.name if product.offer else None
+    )
+
+def _products_after(after: Optional[ObjectId], limit: int):
+    query = Product.objects.order_by("id")
+    if after is not None:
+        query = query.filter(id__gt=after)
+    return resolve_references(query.limit(limit), *PRODUCT_REFERENCES)
+
+def get_products(limit: int = settings.PRODUCT_PAGE_LIMIT, after: Optional[str] = None):
+    cursor = None
+    if after:
+        if not ObjectId.is_valid(after):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        cursor = ObjectId(after)
+
+    # Fetch one extra document to know whether another page exists.
+    products = _products_after(cursor, limit + 1)
+    next_cursor = str(products[limit - 1].id) if len(products) > limit else None
+
+    return ProductPage(
+        items=[build_product_response(product) for product in products[:limit]],
+        next_cursor=next_cursor
+    )
+
+def iter_products(batch_size: int = settings.PRODUCT_STREAM_BATCH_SIZE):
+    cursor = None
+    while True:
+        products = _products_after(cursor, batch_size)
+        for product in products:
+            yield build_product_response(product)
+        if len(products) < batch_size:
+            return
+        cursor = products[-1].id
     
 def get_product(name: str):
     try:
@@ -131,14 +197,14 @@ def update_product(name: str, product_update: ProductUpdate):
 
     if product_update.category_name:
         try:
-            category = Category.objects.get(name=product_update.category_name)
+            category = catalog_cache.get_by_name(Category, product_update.category_name)
             product.category = category
         except DoesNotExist:
             raise HTTPException(status_code=404, detail="Category not found")
 
     if product_update.brand_name:
         try:
-            brand = Brand.objects.get(name=product_update.brand_name)
+            brand = catalog_cache.get_by_name(Brand, product_update.brand_name)
             product.brand = brand
         except DoesNotExist:
             raise HTTPException(status_code=404, detail="Brand not found")
@@ -184,14 +250,16 @@ def create_offer(offer_data: OfferBase):
             is_active=offer_data.is_active
         )
         new_offer.save()
+        catalog_cache.put(new_offer)
         return new_offer
 
 def update_offer(offer_name: str, offer_data: OfferUpdate):
     try:
-        offer = Offer.objects.get(name=offer_name)  
-    except Offer.DoesNotExist:
+        offer = Offer.objects.get(name=offer_name)
+    except DoesNotExist:
         raise HTTPException(status_code=404, detail="Offer not found")
 
+    catalog_cache.invalidate(offer)
     if offer_data.name:
         offer.name = offer_data.name
     if offer_data.discount_percent:
@@ -204,12 +272,15 @@ def update_offer(offer_name: str, offer_data: OfferUpdate):
         offer.is_active = offer_data.is_active
 
     offer.save() 
+    catalog_cache.put(offer)
     return offer
 
 def delete_offer_by_name(offer_name: str):
-    offer = Offer.objects.get(name=offer_name)
-    if not offer:
+    try:
+        offer = catalog_cache.get_by_name(Offer, offer_name)
+    except DoesNotExist:
         raise HTTPException(status_code=404, detail="Offer not found")
+    catalog_cache.invalidate(offer)
     offer.delete()  
     return {"detail": "Offer deleted successfully"}
 
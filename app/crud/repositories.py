@@ -0,0 +1,27 @@
+from app.crud import product_crud, cart_crud, order_crud, coupon_crud, wishlist_crud, user_crud, token_crud, idempotency_crud, payment_crud
+from app.utils.concurrency import run_blocking
+
+# Async facades over the mongoengine crud modules. Every call runs on the
+# bounded blocking-io pool so route handlers never block the event loop.
+class AsyncRepository:
+    def __init__(self, module):
+        self._module = module
+
+    def __getattr__(self, name):
+        func = getattr(self._module, name)
+
+        async def call(*args, **kwargs):
+            return await run_blocking(func, *args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+products = AsyncRepository(product_crud)
+carts = AsyncRepository(cart_crud)
+orders = AsyncRepository(order_crud)
+coupons = AsyncRepository(coupon_crud)
+wishlists = AsyncRepository(wishlist_crud)
+users = AsyncRepository(user_crud)
+tokens = AsyncRepository(token_crud)
+idempotency = AsyncRepository(idempotency_crud)
+payments = AsyncRepository(payment_crud)
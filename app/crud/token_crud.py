@@ -0,0 +1,47 @@
+import hashlib
+import hmac
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from app.models.tokens import RefreshToken
+from app.models.users import User
+from app.config import settings
+
+def _digest(token: str) -> str:
+    return hmac.new(settings.SECRET_KEY.encode(), token.encode(), hashlib.sha256).hexdigest()
+
+def issue_refresh_token(username: str, family_id: str = None):
+    token = secrets.token_urlsafe(32)
+    family_id = family_id or uuid.uuid4().hex
+    RefreshToken(
+        token_hash=_digest(token),
+        family_id=family_id,
+        username=username,
+        expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ).save()
+    return token, family_id
+
+def revoke_token_family(family_id: str):
+    RefreshToken.objects(family_id=family_id).update(set__revoked=True)
+
+# Each refresh token is single-use. Presenting one that was already rotated
+# means it leaked, so the whole family (every token descended from the same
+# login) is revoked and the legitimate holder has to log in again.
+def rotate_refresh_token(token: str):
+    token_hash = _digest(token)
+    now = datetime.utcnow()
+    current = RefreshToken.objects(token_hash=token_hash, used_at=None, revoked=False, expires_at__gt=now).modify(set__used_at=now)
+    if current is None:
+        presented = RefreshToken.objects(token_hash=token_hash).first()
+        if presented is not None and presented.used_at is not None:
+            revoke_token_family(presented.family_id)
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    user = User.objects(username=current.username).only("username", "role").first()
+    if user is None:
+        revoke_token_family(current.family_id)
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    new_token, family_id = issue_refresh_token(user.username, current.family_id)
+    return user, new_token, family_id
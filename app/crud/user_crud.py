@@ -1,9 +1,10 @@
 from fastapi import HTTPException
-from app.models.users import User, Seller, Buyer, Address
+from app.models.users import User, Seller, Buyer, Admin, Address
 from app.schemas.userschema import UserUpdate, UserResponse, SellerResponse, UserCreate, SellerBase, AddressBase, BuyerResponse
 from typing import List
 from bson import ObjectId
 from pymongo import errors
+from app.utils.principal_cache import principal_cache
 
 ADMIN_SECRET_CODE = "accesstoadmin"
 
@@ -12,7 +13,7 @@ def get_users():
     return [UserResponse(username=user.username, email=user.email, role=user.role, phone_no=user.phone_no) for user in users]
 
 def get_user_by_username(username: str):
-    user = User.objects.get(username=username)
+    user = User.objects(username=username).first()
     if user:
         return user
     else:
@@ -33,6 +34,8 @@ def update_user(username: str, user_update: UserUpdate):
         user.phone_no = user_update.phone_no
 
     user.save()
+    principal_cache.pop(username)
+    principal_cache.pop(user.username)
     user.reload()
     return user
 
@@ -40,11 +43,12 @@ def delete_user(username: str):
     user = User.objects.get(username=username)
     if user:
         user.delete()
+        principal_cache.pop(username)
         return {"message": f"User {username} and associated profile deleted successfully"}
     else:
         raise HTTPException(status_code=404, detail="User not found")
 
-def create_seller_profile(user_data):
+def create_seller_profile(user_data, hashed_password: str = None):
     seller = Seller(
         username=user_data.username,
         email=user_data.email,
@@ -54,7 +58,10 @@ def create_seller_profile(user_data):
         store_name="",  
         store_address=""  
     )
-    seller.set_password(user_data.password)
+    if hashed_password:
+        seller.hashed_password = hashed_password
+    else:
+        seller.set_password(user_data.password)
     seller.save()
     return seller
 
@@ -70,6 +77,7 @@ def update_seller(username: str, seller_update: SellerBase):
         seller.store_address = seller_update.store_address
 
     seller.save()
+    principal_cache.pop(username)
     return SellerResponse(
         username=seller.username,
         email=seller.email,
@@ -79,7 +87,22 @@ def update_seller(username: str, seller_update: SellerBase):
         store_address=seller.store_address
     )
 
-def create_buyer_profile(user_data):
+def create_admin_profile(user_data, hashed_password: str = None):
+    admin = Admin(
+        username=user_data.username,
+        email=user_data.email,
+        full_name=user_data.full_name,
+        role="admin",
+        phone_no= user_data.phone_no
+    )
+    if hashed_password:
+        admin.hashed_password = hashed_password
+    else:
+        admin.set_password(user_data.password)
+    admin.save()
+    return admin
+
+def create_buyer_profile(user_data, hashed_password: str = None):
     buyer = Buyer(
         username=user_data.username,
         email=user_data.email,
@@ -88,7 +111,10 @@ def create_buyer_profile(user_data):
         phone_no= user_data.phone_no,
         addresses=[]  
     )
-    buyer.set_password(user_data.password)
+    if hashed_password:
+        buyer.hashed_password = hashed_password
+    else:
+        buyer.set_password(user_data.password)
     buyer.save()
     return buyer
 
@@ -108,6 +134,7 @@ def add_buyer_addresses(username: str, address_data_list: List[AddressBase]):
         new_address = Address(**address_data.model_dump())
         buyer.add_address(new_address)
     buyer.save()
+    principal_cache.pop(username)
     addresses = [AddressBase(**addr.to_mongo()) for addr in buyer.addresses]
     return BuyerResponse(
             username=buyer.username,
@@ -163,6 +190,7 @@ def update_buyer_address(username: str, index: int, address_update: AddressBase)
         address.address_type = address_update.address_type
 
     buyer.save()
+    principal_cache.pop(username)
 
     addresses = [AddressBase(**addr.to_mongo()) for addr in buyer.addresses]
     return BuyerResponse(
@@ -182,6 +210,7 @@ def delete_buyer_address(username: str, index: int):
         raise HTTPException(status_code=404, detail="Address not found at this index")
     buyer.addresses.pop(index)
     buyer.save()
+    principal_cache.pop(username)
     return {"detail": "Address successfully deleted"}
 
 def delete_all_addresses(username: str):
@@ -191,5 +220,6 @@ def delete_all_addresses(username: str):
         raise HTTPException(status_code=404, detail="Buyer not found")
     buyer.addresses=[]
     buyer.save()
+    principal_cache.pop(username)
     
     return {"detail": "All addresses successfully deleted"}
@@ -5,55 +5,40 @@ from app.models.products import Product
 from app.models.wishlists import Wishlist
 from app.schemas.wishlistschema import WishlistItemModel, WishlistResponse
 
-def add_to_wishlist(username: str, product_name: str):
+def _get_product(product_name: str):
     try:
-        product = Product.objects.get(name=product_name)
+        return Product.objects.only("id").get(name=product_name)
     except DoesNotExist:
         raise HTTPException(status_code=404, detail="Product not found")
-    
-    buyer = Buyer.objects.get(username=username)
-    
-    wishlist = Wishlist.objects.filter(buyer=buyer).first()
-    if not wishlist:
-        wishlist = Wishlist(buyer=buyer)
-        wishlist.save()
-
-    wishlist.add_item(product)
-    wishlist.save()
 
+# Items are read as raw references and named with one projected query,
+# instead of dereferencing every full product.
+def _wishlist_response(buyer: Buyer, wishlist: Wishlist = None):
+    product_ids = [item.id for item in wishlist._data.get("items") or []] if wishlist else []
+    names = dict(Product.objects(id__in=product_ids).scalar("id", "name")) if product_ids else {}
     return WishlistResponse(
         buyer_name=buyer.username,
-        items=[WishlistItemModel(product_name=item.name) for item in wishlist.items]
+        items=[WishlistItemModel(product_name=names[product_id]) for product_id in product_ids if product_id in names]
     )
 
-def get_wishlist(username: str):
+def add_to_wishlist(username: str, product_name: str):
+    product = _get_product(product_name)
     buyer = Buyer.objects.get(username=username)
-    wishlist = Wishlist.objects.filter(buyer=buyer).first()
 
-    if not wishlist:
-        return WishlistResponse(buyer_name=buyer.username, items=[])
+    Wishlist.objects(buyer=buyer).update_one(add_to_set__items=product, upsert=True)
+    return _wishlist_response(buyer, Wishlist.objects(buyer=buyer).first())
 
-    return WishlistResponse(
-        buyer_name=buyer.username,
-        items=[WishlistItemModel(product_name=item.name) for item in wishlist.items]
-    )
+def get_wishlist(username: str):
+    buyer = Buyer.objects.get(username=username)
+    return _wishlist_response(buyer, Wishlist.objects(buyer=buyer).first())
 
 def remove_from_wishlist(username: str, product_name: str):
     buyer = Buyer.objects.get(username=username)
-    wishlist = Wishlist.objects.filter(buyer=buyer).first()
+    wishlist = Wishlist.objects(buyer=buyer).only("id").first()
 
     if not wishlist:
         raise HTTPException(status_code=404, detail="Wishlist not found")
 
-    try:
-        product = Product.objects.get(name=product_name)
-    except DoesNotExist:
-        raise HTTPException(status_code=404, detail="Product not found")
-
-    wishlist.remove_item(product)
-    wishlist.save()
-
-    return WishlistResponse(
-        buyer_name=buyer.username,
-        items=[WishlistItemModel(product_name=item.product.name) for item in wishlist.items]
-    )
+    product = _get_product(product_name)
+    Wishlist.objects(id=wishlist.id).update_one(pull__items=product)
+    return _wishlist_response(buyer, Wishlist.objects(id=wishlist.id).first())
@@ -2,6 +2,7 @@ from mongoengine import Document, ReferenceField, IntField, DateTimeField, CASCA
 from app.models.users import Buyer
 from datetime import datetime
 from app.models.products import Product
+from app.utils.dereference import resolve_references
 
 class CartItem(EmbeddedDocument):
     product = ReferenceField(Product, required=True)
@@ -12,6 +13,14 @@ class Cart(Document):
     items = ListField(EmbeddedDocumentField(CartItem), default=list)
     created_at = DateTimeField(default=datetime.now)
     updated_at = DateTimeField(default=datetime.now)
+    version = IntField(default=0)
+
+    meta = {
+        'indexes': [
+            {'fields': ['buyer'], 'unique': True},
+            'updated_at',
+        ]
+    }
 
     def add_item(self, product: Product, quantity: int = 1):
         for item in self.items:
@@ -22,18 +31,22 @@ class Cart(Document):
             new_item = CartItem(product=product, quantity=quantity)
             self.items.append(new_item)
         self.updated_at = datetime.now()
+        self.version += 1
         self.save()
 
     def remove_item(self, product: Product):
         self.items = [item for item in self.items if item.product != product]
         self.updated_at = datetime.now()
+        self.version += 1
         self.save()
 
     def clear_cart(self):
         self.items =[]
         self.updated_at = datetime.now()
+        self.version += 1
         self.save()
 
     def get_total_price(self):
+        resolve_references(self.items, "product", "product.offer", cached=False)
         total = sum(item.product.get_final_price() * item.quantity for item in self.items)
         return total
\ No newline at end of file
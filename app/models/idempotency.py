@@ -0,0 +1,21 @@
+from mongoengine import Document, StringField, DictField, IntField, DateTimeField, ReferenceField, CASCADE
+from app.models.users import Buyer
+from datetime import datetime
+
+class IdempotencyRecord(Document):
+    buyer = ReferenceField(Buyer, required=True, reverse_delete_rule=CASCADE)
+    key = StringField(required=True, max_length=255)
+    request_hash = StringField(required=True)
+    status = StringField(choices=["in_progress", "completed"], default="in_progress")
+    status_code = IntField(null=True)
+    response = DictField(null=True)
+    locked_until = DateTimeField(required=True)
+    created_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'collection': 'idempotency_records',
+        'indexes': [
+            {'fields': ['buyer', 'key'], 'unique': True},
+            {'fields': ['created_at'], 'expireAfterSeconds': 24 * 3600},
+        ]
+    }
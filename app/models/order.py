@@ -1,6 +1,6 @@
-from mongoengine import Document, ReferenceField, DecimalField, StringField, DateTimeField, CASCADE, ListField, EmbeddedDocumentField, EmbeddedDocument
+from mongoengine import Document, ReferenceField, DecimalField, StringField, DateTimeField, IntField, CASCADE, ListField, EmbeddedDocumentField, EmbeddedDocument
 from app.models.users import Buyer, Address
-from app.models.carts import CartItem
+from app.models.products import Product
 from app.models.coupon import Coupon
 from datetime import datetime
 
@@ -13,17 +13,51 @@ class Charge(EmbeddedDocument):
     def __str__(self):
         return f"Charge Amount: {self.amount}"
 
+class SellerSnapshot(EmbeddedDocument):
+    seller_name = StringField()
+    seller_contact = StringField()
+    store_name = StringField()
+    store_location = StringField()
+
+# A cart line frozen at checkout. The product reference is kept for stock
+# and reporting, but responses read the snapshot so later edits to the
+# product or seller do not change what the buyer was charged.
+class OrderLine(EmbeddedDocument):
+    product = ReferenceField(Product, required=True)
+    quantity = IntField(required=True, min_value=1)
+    product_name = StringField()
+    unit_price = DecimalField(precision=2)
+    final_price = DecimalField(precision=2)
+    seller = EmbeddedDocumentField(SellerSnapshot)
+
 class Order(Document):
     buyer = ReferenceField(Buyer, required=True, reverse_delete_rule=CASCADE)
-    items = ListField(EmbeddedDocumentField(CartItem), required=True)
+    buyer_name = StringField()
+    items = ListField(EmbeddedDocumentField(OrderLine), required=True)
     total_price = DecimalField(required=True, precision=2)
     final_price = DecimalField(required=True, precision=2, default=0.00)
     payment_method = StringField(choices=["cod", "online"], required=True)
     payment_status = StringField(choices=["pending", "succeeded", "failed"], default="pending")
+    payment_review = StringField(choices=["paid_after_failure"], null=True)
+    # Token of the apply_payment_outcomes call that last settled or flagged the order.
+    settled_by = StringField(null=True)
     delivery_address = EmbeddedDocumentField(Address, required=True)
     order_at = DateTimeField(default=datetime.now)
     coupon = ReferenceField(Coupon, null=True)
+    coupon_code = StringField(null=True)
     charge = EmbeddedDocumentField(Charge, null=True)  
+    reservation_id = StringField(null=True)
+    reservation_expires_at = DateTimeField(null=True)
+
+    meta = {
+        'indexes': [
+            {'fields': ['buyer', '-order_at', '-id']},
+            'charge.stripe_checkout_id',
+            {'fields': ['reservation_id'], 'sparse': True},
+            ('payment_status', 'reservation_expires_at'),
+            ('payment_status', 'id'),
+        ]
+    }
 
     def apply_coupon(self, coupon):
         if coupon.is_valid_for_buyer(self.buyer):
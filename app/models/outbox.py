@@ -0,0 +1,25 @@
+from mongoengine import Document, StringField, DictField, IntField, DateTimeField
+from datetime import datetime
+
+class OutboxMessage(Document):
+    kind = StringField(required=True, choices=["order_invoice_email", "order_sms", "low_stock_check"])
+    payload = DictField(default=dict)
+    status = StringField(choices=["pending", "processing", "done", "dead"], default="pending")
+    attempts = IntField(default=0)
+    next_attempt_at = DateTimeField(default=datetime.now)
+    locked_until = DateTimeField(null=True)
+    last_error = StringField(null=True)
+    created_at = DateTimeField(default=datetime.now)
+    completed_at = DateTimeField(null=True)
+
+    meta = {
+        'collection': 'outbox',
+        'indexes': [
+            ('status', 'next_attempt_at'),
+            ('status', 'locked_until'),
+            {'fields': ['completed_at'], 'expireAfterSeconds': 7 * 24 * 3600},
+        ]
+    }
+
+    def __str__(self):
+        return f"{self.kind} ({self.status})"
@@ -0,0 +1,22 @@
+from mongoengine import Document, StringField, DictField, DateTimeField
+from datetime import datetime
+
+class StripeEvent(Document):
+    event_id = StringField(required=True, unique=True)
+    type = StringField(required=True)
+    checkout_session_id = StringField(null=True)
+    payload = DictField(default=dict)
+    status = StringField(choices=["pending", "applied", "ignored"], default="pending")
+    received_at = DateTimeField(default=datetime.now)
+    applied_at = DateTimeField(null=True)
+
+    meta = {
+        'collection': 'stripe_events',
+        'indexes': [
+            ('status', 'received_at'),
+            {'fields': ['applied_at'], 'expireAfterSeconds': 30 * 24 * 3600},
+        ]
+    }
+
+    def __str__(self):
+        return f"{self.type} {self.event_id} ({self.status})"
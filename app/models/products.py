@@ -27,6 +27,12 @@ class Offer(Document):
     def __str__(self):
         return f"{self.name} - {self.discount_percent}% off"
 
+class StockReservation(EmbeddedDocument):
+    reservation_id = StringField(required=True)
+    quantity = IntField(required=True, min_value=1)
+    expires_at = DateTimeField(null=True)
+    created_at = DateTimeField(default=datetime.now)
+
 class Product(Document):
     name = StringField(required=True, max_length=100)
     description = StringField()
@@ -36,6 +42,11 @@ class Product(Document):
     brand = ReferenceField(Brand, required=True, reverse_delete_rule=CASCADE)  
     seller = ReferenceField(Seller, required=True, reverse_delete_rule=CASCADE)  
     offer = ReferenceField(Offer, default=None, reverse_delete_rule=CASCADE)  
+    reservations = ListField(EmbeddedDocumentField(StockReservation), default=list)
+
+    meta = {
+        'indexes': ['reservations.reservation_id', 'reservations.expires_at']
+    }
 
     def get_final_price(self):
         if self.offer and self.offer.is_active:
@@ -43,13 +54,6 @@ class Product(Document):
                 return self.price - (self.price * self.offer.discount_percent / 100)
         return self.price
     
-    def reduce_stock(self, quantity: int):
-        if self.stock >= quantity:
-            self.stock -= quantity
-            self.save()
-        else:
-            raise ValueError("Not enough stock available.")
-
     def __str__(self):
         return self.name
     
@@ -0,0 +1,32 @@
+from mongoengine import Document, StringField, DateTimeField, BooleanField
+from datetime import datetime
+
+class RevokedToken(Document):
+    jti = StringField(required=True, unique=True)
+    expires_at = DateTimeField(required=True)
+    revoked_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        'collection': 'revoked_tokens',
+        'indexes': [
+            {'fields': ['expires_at'], 'expireAfterSeconds': 0},
+            'revoked_at',
+        ]
+    }
+
+class RefreshToken(Document):
+    token_hash = StringField(required=True, unique=True)
+    family_id = StringField(required=True)
+    username = StringField(required=True)
+    expires_at = DateTimeField(required=True)
+    created_at = DateTimeField(default=datetime.utcnow)
+    used_at = DateTimeField(null=True)
+    revoked = BooleanField(default=False)
+
+    meta = {
+        'collection': 'refresh_tokens',
+        'indexes': [
+            {'fields': ['expires_at'], 'expireAfterSeconds': 0},
+            'family_id',
+        ]
+    }
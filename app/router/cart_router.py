@@ -1,35 +1,42 @@
 from fastapi import APIRouter, HTTPException, Depends
-from app.crud.cart_crud import add_to_cart,remove_from_cart,update_cart_item, get_cart
+from app.crud.repositories import carts
 from app.schemas.userschema import UserResponse
-from app.schemas.cartschema import CartItemModel, CartItemUpdate, CartResponse
+from app.schemas.cartschema import CartItemModel, CartItemUpdate, CartResponse, CartBatchRequest
 from app.dependencies import get_current_user
 
 router = APIRouter()
 
 @router.post("/add", response_model=CartResponse)
-def add_to_cart_route(cart_data: CartItemModel, current_user: UserResponse = Depends(get_current_user)):
+async def add_to_cart_route(cart_data: CartItemModel, current_user: UserResponse = Depends(get_current_user)):
     if current_user.role == "admin" and "seller":
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    cart_response = add_to_cart(current_user.username, cart_data.product_name, cart_data.quantity)
+    cart_response = await carts.add_to_cart(current_user, cart_data.product_name, cart_data.quantity)
     return cart_response
 
 @router.get("/", response_model=CartResponse)
-def get_cart_route(current_user: UserResponse = Depends(get_current_user)):
+async def get_cart_route(current_user: UserResponse = Depends(get_current_user)):
     if current_user.role == "admin" and "seller":
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    cart_response = get_cart(current_user.username)
+    cart_response = await carts.get_cart(current_user)
     return cart_response
 
 @router.put("/update", response_model=CartResponse)
-def update_cart_route(cart_data: CartItemUpdate, current_user: UserResponse = Depends(get_current_user)):
+async def update_cart_route(cart_data: CartItemUpdate, current_user: UserResponse = Depends(get_current_user)):
     if current_user.role == "admin" and "seller":
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    cart_response = update_cart_item(current_user.username, cart_data.product_name, cart_data.quantity)
+    cart_response = await carts.update_cart_item(current_user, cart_data.product_name, cart_data.quantity)
     return cart_response
 
 @router.delete("/remove", response_model=CartResponse)
-def remove_from_cart_route(product_name: str, current_user: UserResponse = Depends(get_current_user)):
+async def remove_from_cart_route(product_name: str, current_user: UserResponse = Depends(get_current_user)):
     if current_user.role == "admin" and "seller":
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    cart_response = remove_from_cart(current_user.username, product_name)
+    cart_response = await carts.remove_from_cart(current_user, product_name)
+    return cart_response
+
+@router.post("/batch", response_model=CartResponse)
+async def batch_cart_route(batch: CartBatchRequest, current_user: UserResponse = Depends(get_current_user)):
+    if current_user.role == "admin" and "seller":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    cart_response = await carts.apply_cart_batch(current_user, batch.operations)
     return cart_response
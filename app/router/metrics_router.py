@@ -0,0 +1,26 @@
+from fastapi import APIRouter, HTTPException, Depends
+from app.schemas.userschema import UserResponse
+from app.dependencies import get_current_user
+from app.utils.catalog_cache import catalog_cache
+from app.utils.concurrency import executor_stats, run_blocking
+from app.crud.outbox_crud import outbox_stats
+from app.utils.invoice import mailer
+from app.utils.revocation import revocation_store
+from app.utils.principal_cache import principal_cache
+from app.utils.password_pool import password_pool
+
+router = APIRouter()
+
+@router.get("/")
+async def get_metrics(current_user: UserResponse = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return {
+        "catalog_cache": catalog_cache.stats(),
+        "blocking_io": executor_stats(),
+        "outbox": await run_blocking(outbox_stats),
+        "mailer": mailer.stats(),
+        "token_revocation": revocation_store.stats(),
+        "principal_cache": principal_cache.stats(),
+        "password_pool": password_pool.stats(),
+    }
@@ -1,13 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends, Request, BackgroundTasks
-from app.crud.order_crud import create_order_logic, retrieve_order_history
+from fastapi import APIRouter, HTTPException, Depends, Request, Query, Header
+from fastapi.encoders import jsonable_encoder
+from app.crud.repositories import orders, idempotency, payments
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+import asyncio
+import hashlib
+import os
+import time
 from app.models.order import Order
-from app.schemas.orderschema import OrderCreate, OrderResponse, OrderItem, DeliveryAddress, SellerInfo, ChargeResponse, PaymentMethod, PaymentStatus
+from app.schemas.orderschema import OrderCreate, OrderResponse, OrderPage, OrderItem, DeliveryAddress, SellerInfo, ChargeResponse, PaymentMethod, PaymentStatus
 from app.dependencies import get_current_user
 from app.models.users import Buyer
-from typing import List
-from app.utils.invoice import send_sms_notification, send_email_with_invoice, generate_invoice_pdf
+from typing import List, Optional
+from app.utils.invoice_queue import invoice_path
 import stripe
 from app.config import settings
 from decimal import Decimal
@@ -16,102 +21,76 @@ router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
 stripe.api_key= settings.STRIPE_API_KEY
 
+async def _wait_for_completion(current_buyer: Buyer, key: str):
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        await asyncio.sleep(settings.IDEMPOTENCY_POLL_SECONDS)
+        record = await idempotency.get_request(current_buyer, key)
+        if record is None or record.status == "completed":
+            return record
+    raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+
 @router.post("/")
-async def create_order(order_data: OrderCreate, background_tasks: BackgroundTasks, request: Request, current_buyer: Buyer = Depends(get_current_user)):
-    order = await create_order_logic(order_data, current_buyer)
-    
-    if order_data.payment_method == PaymentMethod.COD:
-        pdf_path = generate_invoice_pdf(order)
-        background_tasks.add_task(
-            send_email_with_invoice,
-            to_email=current_buyer.email,
-            subject="Your Order Invoice",
-            order_data=order,
-            attachment_path=pdf_path
-        )
-        background_tasks.add_task(
-            send_sms_notification,
-            phone_number=current_buyer.phone_no,
-            message_body=f"Your order with ID {order.order_id} has been placed successfully."
-        )
+async def create_order(order_data: OrderCreate, request: Request, idempotency_key: Optional[str] = Header(None, max_length=255), current_buyer: Buyer = Depends(get_current_user)):
+    if not idempotency_key:
+        return await orders.create_order_logic(order_data, current_buyer)
+
+    request_hash = hashlib.sha256(order_data.model_dump_json().encode()).hexdigest()
+    while True:
+        record = await idempotency.begin_request(current_buyer, idempotency_key, request_hash)
+        if record is None:
+            break
+        if record.status == "in_progress":
+            record = await _wait_for_completion(current_buyer, idempotency_key)
+            if record is None:
+                # The first attempt failed and released the key; run this one instead.
+                continue
+        return JSONResponse(status_code=record.status_code, content=record.response, headers={"Idempotent-Replayed": "true"})
 
-    return order
+    try:
+        order = await orders.create_order_logic(order_data, current_buyer)
+    except Exception:
+        await idempotency.abandon_request(current_buyer, idempotency_key)
+        raise
+    response = jsonable_encoder(order)
+    await idempotency.complete_request(current_buyer, idempotency_key, 200, response)
+    return response
 
-@router.get("/order-history/", response_model=List[OrderResponse])
-async def get_order_history(current_buyer: Buyer = Depends(get_current_user)):
-    order_history_response = retrieve_order_history(current_buyer)
+@router.get("/order-history/", response_model=OrderPage)
+async def get_order_history(limit: int = Query(settings.ORDER_HISTORY_PAGE_LIMIT, ge=1, le=100), after: Optional[str] = None, current_buyer: Buyer = Depends(get_current_user)):
+    order_history_response = await orders.retrieve_order_history(current_buyer, limit, after)
     return order_history_response
 
-@router.get("/payment-success", response_class=HTMLResponse)
-async def payment_success(request: Request, session_id: str, background_tasks: BackgroundTasks):
-    checkout_session = stripe.checkout.Session.retrieve(session_id)
+@router.get("/invoice/{invoice_id}")
+async def get_invoice(invoice_id: str, current_buyer: Buyer = Depends(get_current_user)):
+    await orders.get_buyer_order(invoice_id, current_buyer)
+    pdf_path = invoice_path(invoice_id)
+    if not os.path.exists(pdf_path):
+        return JSONResponse(status_code=202, content={"invoice_id": invoice_id, "status": "rendering"})
+    return FileResponse(pdf_path, media_type="application/pdf", filename=os.path.basename(pdf_path))
 
-    if not checkout_session:
-        raise HTTPException(status_code=404, detail="Invalid session ID")
-    order = Order.objects.filter(charge__stripe_checkout_id=session_id).first()
+@router.post("/stripe-webhook")
+async def stripe_webhook(request: Request):
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        # Without a secret every signature would verify against an empty key.
+        raise HTTPException(status_code=503, detail="Stripe webhooks are not configured")
+    payload = await request.body()
+    try:
+        event = stripe.Webhook.construct_event(payload, request.headers.get("stripe-signature"), settings.STRIPE_WEBHOOK_SECRET)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid payload")
+    except stripe.SignatureVerificationError:
+        raise HTTPException(status_code=400, detail="Invalid signature")
 
+    # Only queued here; app.workers.stripe_event_worker applies it to the order.
+    await payments.record_stripe_event(event)
+    return {"received": True}
+
+@router.get("/payment-success", response_class=HTMLResponse)
+async def payment_success(request: Request, session_id: str):
+    order = await payments.get_order_by_checkout_session(session_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    
-    if order.payment_status == PaymentStatus.SUCCEEDED:
-        raise HTTPException(status_code=400, detail=" Already Payment Succeeded")
-
-    if checkout_session.payment_status == "paid":
-        order.payment_status = PaymentStatus.SUCCEEDED
-        order.save()
-    else:
-        raise HTTPException(status_code=400, detail="Payment not confirmed")
-    
-    if order.payment_method == PaymentMethod.ONLINE:
-        order_response = OrderResponse(
-        order_id=str(order.id),
-        buyer_name=order.buyer.full_name,
-        items=[
-            OrderItem(
-                product_name=item.product.name,
-                quantity=item.quantity,
-                price=item.product.price,
-                seller=SellerInfo(
-                    seller_name=item.product.seller.full_name,
-                    seller_contact=item.product.seller.phone_no,
-                    store_name=item.product.seller.store_name,
-                    store_location=item.product.seller.store_address
-                )
-            ) for item in order.items
-        ],
-        total_price=order.total_price,
-        final_price=order.final_price,
-        coupon_code=order.coupon.code if order.coupon else None,  
-        payment_method=order.payment_method,
-        payment_status=order.payment_status,
-        delivery_address=DeliveryAddress(
-            address_line1=order.delivery_address.address_line1,
-            address_line2=order.delivery_address.address_line2,
-            city=order.delivery_address.city,
-            state=order.delivery_address.state,
-            postal_code=order.delivery_address.postal_code,
-            country=order.delivery_address.country
-        ),
-        order_date=order.order_at,
-        charge=ChargeResponse(
-            amount=order.charge.amount if order.charge else Decimal(0.0),
-            stripe_charge_id=order.charge.stripe_charge_id if order.charge else None,
-            created_at=order.charge.created_at if order.charge else None,
-        ) if order.charge else None
-    )
-        pdf_path = generate_invoice_pdf(order_response)
-        background_tasks.add_task(
-            send_email_with_invoice,
-            to_email=order.buyer.email,
-            subject="Your Order Invoice",
-            order_data=order_response,
-            attachment_path=pdf_path
-        )
-        background_tasks.add_task(
-            send_sms_notification,
-            phone_number=order.buyer.phone_no,
-            message_body=f"Your order with ID {order.id} has been placed successfully."
-        )
 
     return templates.TemplateResponse("payment_success.html", {
         "request": request,
@@ -4,17 +4,31 @@ from app.dependencies import get_current_user, oauth2_scheme
 from app.auth import create_access_token, invalidate_token
 from app.models.users import Admin
 import logging
-from app.crud.user_crud import create_seller_profile, create_buyer_profile
-from app.schemas.userschema import UserCreate,User, UserResponse
+from app.crud.repositories import users, tokens
+from app.utils.concurrency import run_blocking
+from app.utils.password_pool import password_pool, PasswordPoolBusy
+from app.schemas.userschema import UserCreate,User, UserResponse, RefreshRequest
 from datetime import datetime
 
 router = APIRouter()
 ADMIN_SECRET_CODE = "accesstoadmin"
 logging.basicConfig(filename="login_activity.log", level=logging.INFO, format="%(levelname)s - %(message)s",)
 
+async def _password_hash(password: str) -> str:
+    try:
+        return await password_pool.hash(password)
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=503, detail="Too many authentication requests, try again shortly", headers={"Retry-After": "1"})
+
+async def _password_verify(password: str, hashed_password: str) -> bool:
+    try:
+        return await password_pool.verify(password, hashed_password)
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=503, detail="Too many authentication requests, try again shortly", headers={"Retry-After": "1"})
+
 @router.post("/User_registration/", response_model=UserResponse)
 async def register_user(user: UserCreate):
-    existing_user = User.objects(username=user.username).first()
+    existing_user = await run_blocking(User.objects(username=user.username).first)
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already registered")
 
@@ -26,23 +40,16 @@ async def register_user(user: UserCreate):
         raise HTTPException(status_code=400, detail="do not have access to become admin")
 
     new_user = None  
+    hashed_password = await _password_hash(user.password)
 
     if role == "buyer":
-        new_user = create_buyer_profile(user)
+        new_user = await users.create_buyer_profile(user, hashed_password)
 
     elif role == "seller":
-        new_user = create_seller_profile(user)
+        new_user = await users.create_seller_profile(user, hashed_password)
 
     elif role == "admin":
-        new_user = Admin(
-            username=user.username,
-            email=user.email,
-            full_name=user.full_name,
-            role=role,
-            phone_no= user.phone_no
-        )
-        new_user.set_password(user.password)
-        new_user.save()
+        new_user = await users.create_admin_profile(user, hashed_password)
 
     if new_user is None:
         raise HTTPException(status_code=500, detail="Error creating user")
@@ -58,16 +65,26 @@ async def register_user(user: UserCreate):
 
 @router.post("/User_login")
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = User.objects.get(username=form_data.username)
-    if not user or not user.verify_password(form_data.password):
+    user = await run_blocking(User.objects(username=form_data.username).first)
+    if not user or not await _password_verify(form_data.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    access_token = create_access_token(data={"sub": user.username, "role": user.role})
+    refresh_token, family_id = await tokens.issue_refresh_token(user.username)
+    access_token = create_access_token(data={"sub": user.username, "role": user.role, "sid": family_id})
     logging.info(f"User {user.username} logged in at {datetime.now()}")
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+@router.post("/refresh")
+async def refresh(request: RefreshRequest):
+    user, refresh_token, family_id = await tokens.rotate_refresh_token(request.refresh_token)
+    access_token = create_access_token(data={"sub": user.username, "role": user.role, "sid": family_id})
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 @router.post("/User_logout/")
 async def logout(token: str = Depends(oauth2_scheme),current_user: UserResponse = Depends(get_current_user)):
-    invalidate_token(token)  
+    payload = await run_blocking(invalidate_token, token)
+    family_id = payload.get("sid")
+    if family_id:
+        await tokens.revoke_token_family(family_id)
     logging.info(f"User {current_user.username} logged out at {datetime.now()}")
     return {"message": "Successfully logged out"}
\ No newline at end of file
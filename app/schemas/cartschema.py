@@ -1,5 +1,5 @@
 from pydantic import BaseModel,Field
-from typing import Optional, List
+from typing import Optional, List, Literal
 
 class CartItemModel(BaseModel):
     product_name: str
@@ -9,6 +9,14 @@ class CartItemUpdate(BaseModel):
     product_name: Optional[str]= None
     quantity: Optional[int]= 1
 
+class CartBatchOperation(BaseModel):
+    op: Literal["add", "set", "remove"]
+    product_name: str
+    quantity: Optional[int] = None
+
+class CartBatchRequest(BaseModel):
+    operations: List[CartBatchOperation] = Field(..., min_length=1, max_length=100)
+
 class CartModel(BaseModel):
     buyer_name: str
     items: list[CartItemModel]
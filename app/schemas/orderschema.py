@@ -63,6 +63,10 @@ class OrderResponse(BaseModel):
     class Config:
         from_attributes = True 
 
+class OrderPage(BaseModel):
+    items: List[OrderResponse]
+    next_cursor: Optional[str] = None
+
 class Order_Response(OrderResponse):
     order_id: str  
     buyer_name: str  
@@ -76,6 +80,7 @@ class Order_Response(OrderResponse):
     order_date: datetime
     charge: Optional[ChargeResponse] = None
     payment_url: Optional[HttpUrl] = None 
+    invoice_id: Optional[str] = None
 
     class Config:
         from_attributes = True  
@@ -1,5 +1,5 @@
 from pydantic import BaseModel,Field
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 class BrandBase(BaseModel):
@@ -55,6 +55,10 @@ class ProductResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class ProductPage(BaseModel):
+    items: List[ProductResponse]
+    next_cursor: Optional[str] = None
+
 
 class OfferBase(BaseModel):
     name: str
@@ -24,6 +24,9 @@ class UserLogin(BaseModel):
     username: str
     password: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class UserResponse(BaseModel):
     username: str
     email: str
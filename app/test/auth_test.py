@@ -0,0 +1,22 @@
+import unittest
+from unittest.mock import patch
+from app.auth import create_access_token, invalidate_token, verify_token, token_cache, _token_digest
+
+class TestInvalidateToken(unittest.TestCase):
+
+    def setUp(self):
+        self.token = create_access_token({"sub": "alice", "sid": "family-1"})
+
+    def test_returns_the_payload_and_leaves_nothing_cached(self):
+        self.assertEqual(verify_token(self.token)["sid"], "family-1")
+        self.assertIsNotNone(token_cache.get(_token_digest(self.token)))
+
+        with patch("app.auth.revocation_store") as store:
+            payload = invalidate_token(self.token)
+
+        self.assertEqual(payload["sid"], "family-1")
+        store.revoke.assert_called_once()
+        self.assertIsNone(token_cache.get(_token_digest(self.token)))
+
+if __name__ == "__main__":
+    unittest.main()
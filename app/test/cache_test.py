@@ -0,0 +1,41 @@
+import unittest
+from app.utils.cache import TTLCache
+from support import FakeTimer
+
+class TestTTLCache(unittest.TestCase):
+
+    def setUp(self):
+        self.timer = FakeTimer()
+        self.cache = TTLCache(maxsize=2, ttl=10, timer=self.timer)
+
+    def test_hit_and_miss_counters(self):
+        self.assertIsNone(self.cache.get("brand"))
+        self.cache.set("brand", "acme")
+        self.assertEqual(self.cache.get("brand"), "acme")
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_entries_expire_after_ttl(self):
+        self.cache.set("brand", "acme")
+        self.timer.now = 10
+        self.assertIsNone(self.cache.get("brand"))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+        self.cache.set("c", 3)
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_pop_invalidates_entry(self):
+        self.cache.set("brand", "acme")
+        self.assertEqual(self.cache.pop("brand"), "acme")
+        self.assertIsNone(self.cache.get("brand"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+from unittest.mock import patch
+from datetime import datetime, timedelta
+from decimal import Decimal
+from fastapi import HTTPException
+from pydantic import ValidationError
+from app.crud.cart_crud import _batch_items
+from app.schemas.cartschema import CartBatchOperation, CartBatchRequest
+from support import NO_MONGO, connect_test_db, mongo_available
+
+PRODUCTS = {name: f"id-{name}" for name in ("lamp", "desk", "chair")}
+
+def op(op, product_name, quantity=None):
+    return CartBatchOperation(op=op, product_name=product_name, quantity=quantity)
+
+class TestBatchItems(unittest.TestCase):
+
+    def test_applies_operations_in_order(self):
+        items = [{"product": "id-lamp", "quantity": 1}, {"product": "id-desk", "quantity": 2}]
+        quantities = _batch_items(items, [
+            op("add", "lamp", 2),
+            op("set", "desk", 5),
+            op("add", "chair", 1),
+            op("remove", "chair"),
+            op("add", "chair", 3),
+        ], PRODUCTS)
+        self.assertEqual(quantities, {"id-lamp": 3, "id-desk": 5, "id-chair": 3})
+
+    def test_remove_of_absent_item_is_a_no_op(self):
+        self.assertEqual(_batch_items([], [op("remove", "lamp")], PRODUCTS), {})
+
+    def test_set_requires_the_item_in_the_cart(self):
+        with self.assertRaises(HTTPException) as raised:
+            _batch_items([], [op("set", "lamp", 2)], PRODUCTS)
+        self.assertEqual(raised.exception.status_code, 404)
+
+    def test_add_and_set_require_a_positive_quantity(self):
+        items = [{"product": "id-lamp", "quantity": 1}]
+        for operation in (op("add", "lamp"), op("set", "lamp", 0)):
+            with self.assertRaises(HTTPException) as raised:
+                _batch_items(items, [operation], PRODUCTS)
+            self.assertEqual(raised.exception.status_code, 400)
+
+    def test_does_not_mutate_the_snapshot(self):
+        items = [{"product": "id-lamp", "quantity": 1}]
+        _batch_items(items, [op("remove", "lamp")], PRODUCTS)
+        self.assertEqual(items, [{"product": "id-lamp", "quantity": 1}])
+
+    def test_request_size_is_bounded(self):
+        with self.assertRaises(ValidationError):
+            CartBatchRequest(operations=[])
+        with self.assertRaises(ValidationError):
+            CartBatchRequest(operations=[op("remove", "lamp")] * 101)
+
+@unittest.skipUnless(mongo_available(), NO_MONGO)
+class TestApplyCartBatch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        connect_test_db("cart_batch_test")
+
+    @classmethod
+    def tearDownClass(cls):
+        from mongoengine import disconnect
+        from mongoengine.connection import get_db
+        get_db().client.drop_database("cart_batch_test")
+        disconnect()
+
+    def setUp(self):
+        from mongoengine.connection import get_db
+        from app.models.users import Buyer, Seller
+        from app.models.products import Brand, Category, Offer, Product
+        for name in get_db().list_collection_names():
+            get_db()[name].delete_many({})
+
+        seller = Seller(username="shop", email="shop@example.com", phone_no="+911234567890", hashed_password="x", full_name="Shop").save()
+        self.buyer = Buyer(username="alice", email="alice@example.com", hashed_password="x", full_name="Alice").save()
+        category = Category(name="Home").save()
+        brand = Brand(name="Acme").save()
+        offer = Offer(name="Half", discount_percent=Decimal("50"), is_active=True,
+                      start_date=datetime.now() - timedelta(days=1), end_date=datetime.now() + timedelta(days=1)).save()
+        Product(name="lamp", price=Decimal("20.00"), stock=5, category=category, brand=brand, seller=seller, offer=offer).save()
+        Product(name="desk", price=Decimal("80.00"), stock=5, category=category, brand=brand, seller=seller).save()
+
+    def batch(self, *operations):
+        from app.crud.cart_crud import apply_cart_batch
+        return apply_cart_batch(self.buyer, list(operations))
+
+    def test_response_matches_the_cart_pricing(self):
+        from app.crud.cart_crud import price_cart
+        from app.models.carts import Cart
+        self.batch(op("add", "lamp", 1))
+        response = self.batch(op("add", "desk", 2), op("add", "lamp", 1))
+
+        items, total = price_cart(self.buyer)
+        self.assertEqual((response.items, response.total_price), (items, total))
+        self.assertEqual(response.total_price, 180.0)
+        self.assertEqual(Cart.objects.get(buyer=self.buyer).version, 1)
+
+    def test_a_write_between_snapshot_and_update_is_not_lost(self):
+        from app.crud import cart_crud
+        from app.models.carts import Cart
+        self.batch(op("add", "lamp", 1))
+        real_priced_products = cart_crud._priced_products
+        writes = []
+
+        # A single-line write lands after the batch read its snapshot.
+        def concurrent_add(*args):
+            if not writes:
+                writes.append(cart_crud.add_to_cart(self.buyer, "desk", 1))
+            return real_priced_products(*args)
+
+        with patch.object(cart_crud, "_priced_products", side_effect=concurrent_add):
+            response = self.batch(op("set", "lamp", 3))
+
+        self.assertEqual([(item.product_name, item.quantity) for item in response.items], [("lamp", 3), ("desk", 1)])
+        self.assertEqual(Cart.objects.get(buyer=self.buyer).version, 2)
+
+if __name__ == "__main__":
+    unittest.main()
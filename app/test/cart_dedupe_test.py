@@ -0,0 +1,53 @@
+import unittest
+from datetime import datetime, timedelta
+from bson import ObjectId
+from support import NO_MONGO, connect_test_db, mongo_available
+
+@unittest.skipUnless(mongo_available(), NO_MONGO)
+class TestCartDedupe(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        connect_test_db("cart_dedupe_test")
+
+    @classmethod
+    def tearDownClass(cls):
+        from mongoengine import disconnect
+        from mongoengine.connection import get_db
+        get_db().client.drop_database("cart_dedupe_test")
+        disconnect()
+
+    def setUp(self):
+        from app.workers.cart_dedupe import _carts
+        self.collection = _carts()
+        self.collection.drop()
+        self.alice, self.bob = ObjectId(), ObjectId()
+        self.lamp, self.desk = ObjectId(), ObjectId()
+        now = datetime.now()
+        self.collection.insert_many([
+            {"buyer": self.alice, "items": [{"product": self.lamp, "quantity": 1}, {"product": self.desk, "quantity": 1}],
+             "created_at": now - timedelta(days=2), "updated_at": now - timedelta(days=1)},
+            {"buyer": self.alice, "items": [{"product": self.lamp, "quantity": 3}],
+             "created_at": now - timedelta(hours=2), "updated_at": now, "version": 4},
+            {"buyer": self.bob, "items": [{"product": self.desk, "quantity": 2}], "created_at": now, "updated_at": now},
+        ])
+
+    def test_merges_into_the_newest_cart_so_the_index_builds(self):
+        from app.models.carts import Cart
+        from app.workers.cart_dedupe import dedupe
+        self.assertEqual(dedupe(batch_size=1, dry_run=True), 1)
+        self.assertEqual(self.collection.count_documents({}), 3)
+
+        self.assertEqual(dedupe(batch_size=1), 1)
+        alice = self.collection.find_one({"buyer": self.alice})
+        self.assertEqual(self.collection.count_documents({"buyer": self.alice}), 1)
+        self.assertEqual(alice["items"], [{"product": self.lamp, "quantity": 3}, {"product": self.desk, "quantity": 1}])
+        self.assertEqual(alice["version"], 5)
+        self.assertLess(alice["created_at"], alice["updated_at"] - timedelta(days=1))
+        self.assertEqual(self.collection.count_documents({"buyer": self.bob}), 1)
+
+        Cart.ensure_indexes()
+        self.assertEqual(dedupe(batch_size=1), 0)
+
+if __name__ == "__main__":
+    unittest.main()
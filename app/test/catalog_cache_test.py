@@ -0,0 +1,52 @@
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from support import NO_MONGO, connect_test_db, mongo_available
+
+@unittest.skipUnless(mongo_available(), NO_MONGO)
+class TestLivePricing(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        connect_test_db("catalog_cache_test")
+
+    @classmethod
+    def tearDownClass(cls):
+        from mongoengine import disconnect
+        from mongoengine.connection import get_db
+        get_db().client.drop_database("catalog_cache_test")
+        disconnect()
+
+    def setUp(self):
+        from mongoengine.connection import get_db
+        from app.models.users import Seller
+        from app.models.products import Brand, Category, Offer, Product
+        from app.utils.catalog_cache import catalog_cache
+        for name in get_db().list_collection_names():
+            get_db()[name].delete_many({})
+        catalog_cache.clear()
+        self.addCleanup(catalog_cache.clear)
+        seller = Seller(username="shop", email="shop@example.com", hashed_password="x", full_name="Shop").save()
+        self.offer = Offer(name="Sale", discount_percent=Decimal("10"), start_date=datetime.now() - timedelta(days=1),
+                           end_date=datetime.now() + timedelta(days=1)).save()
+        self.product = Product(name="Lamp", price=Decimal("100.00"), stock=5, category=Category(name="Home").save(),
+                               brand=Brand(name="Acme").save(), seller=seller, offer=self.offer).save()
+
+    def final_price(self, cached):
+        from app.models.products import Product
+        from app.utils.dereference import resolve_references
+        product = Product.objects.get(id=self.product.id)
+        resolve_references([product], "offer", cached=cached)
+        return product.get_final_price()
+
+    def test_price_sensitive_reads_skip_a_stale_cache(self):
+        from app.models.products import Offer
+        self.assertEqual(self.final_price(cached=True), Decimal("90.00"))
+        # Another worker ends the sale; this worker's cache still has it.
+        Offer.objects(id=self.offer.id).update_one(set__is_active=False)
+
+        self.assertEqual(self.final_price(cached=True), Decimal("90.00"))
+        self.assertEqual(self.final_price(cached=False), Decimal("100.00"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+from support import NO_MONGO, connect_test_db, mongo_available
+
+# The non-transactional checkout path: a failure after the order insert must
+# leave stock, coupon, cart and order collections as they were.
+@unittest.skipUnless(mongo_available(), NO_MONGO)
+class TestCheckoutCompensation(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        connect_test_db("checkout_compensation_test")
+
+    @classmethod
+    def tearDownClass(cls):
+        from mongoengine import disconnect
+        from mongoengine.connection import get_db
+        get_db().client.drop_database("checkout_compensation_test")
+        disconnect()
+
+    def setUp(self):
+        from mongoengine.connection import get_db
+        from app.models.users import Address, Buyer, Seller
+        from app.models.products import Brand, Category, Product
+        from app.models.carts import Cart, CartItem
+        from app.models.coupon import Coupon
+        for name in get_db().list_collection_names():
+            get_db()[name].delete_many({})
+
+        seller = Seller(username="shop", email="shop@example.com", phone_no="+911234567890", hashed_password="x", full_name="Shop").save()
+        self.buyer = Buyer(username="alice", email="alice@example.com", hashed_password="x", full_name="Alice", addresses=[
+            Address(address_line1="1 Main St", city="Pune", state="MH", postal_code="411001", country="IN", is_primary=True)
+        ]).save()
+        category = Category(name="Home").save()
+        brand = Brand(name="Acme").save()
+        self.lamp = Product(name="Lamp", price=Decimal("20.00"), stock=50, category=category, brand=brand, seller=seller).save()
+        self.desk = Product(name="Desk", price=Decimal("80.00"), stock=50, category=category, brand=brand, seller=seller).save()
+        self.cart = Cart(buyer=self.buyer, items=[CartItem(product=self.lamp, quantity=2), CartItem(product=self.desk, quantity=1)]).save()
+        self.coupon = Coupon(code="ONCE", discount_percentage=Decimal("10"), max_discount_amount=Decimal("50"),
+                             min_order_value=Decimal("0"), is_single_use=True, expiration_date=datetime.now() + timedelta(days=1)).save()
+
+    def checkout(self):
+        from app.crud.order_crud import create_order_logic
+        from app.schemas.orderschema import OrderCreate
+        return create_order_logic(OrderCreate(payment_method="cod", coupon_code="ONCE"), self.buyer)
+
+    def assertUntouched(self):
+        from app.models.order import Order, OrderHistory
+        from app.models.outbox import OutboxMessage
+        self.lamp.reload()
+        self.desk.reload()
+        self.cart.reload()
+        self.coupon.reload()
+        self.assertEqual((self.lamp.stock, self.desk.stock), (50, 50))
+        self.assertEqual((self.lamp.reservations, self.desk.reservations), ([], []))
+        self.assertEqual([(item.product.id, item.quantity) for item in self.cart.items], [(self.lamp.id, 2), (self.desk.id, 1)])
+        self.assertEqual(self.coupon.used_by, [])
+        self.assertEqual((Order.objects.count(), OrderHistory.objects.count(), OutboxMessage.objects.count()), (0, 0, 0))
+
+    def test_places_the_order(self):
+        from app.models.outbox import OutboxMessage
+        self.checkout()
+        self.lamp.reload()
+        self.cart.reload()
+        self.coupon.reload()
+        self.assertEqual((self.lamp.stock, self.lamp.reservations), (48, []))
+        self.assertEqual(self.cart.items, [])
+        self.assertEqual([buyer.id for buyer in self.coupon.used_by], [self.buyer.id])
+        self.assertEqual(OutboxMessage.objects.count(), 3)
+
+    def test_low_stock_is_checked_by_the_worker(self):
+        from app.models.outbox import OutboxMessage
+        from app.workers.outbox_worker import check_low_stock
+        self.desk.update(set__stock=10)
+        self.checkout()
+        message = OutboxMessage.objects.get(kind="low_stock_check")
+
+        with patch("app.workers.outbox_worker.low_stock_alerts") as alerts:
+            check_low_stock(message.payload)
+        alerts.record.assert_called_once_with("shop@example.com", "Desk", 9)
+
+    def test_failed_history_write_is_undone(self):
+        with patch("app.crud.order_crud.OrderHistory", side_effect=RuntimeError("history unavailable")):
+            with self.assertRaises(RuntimeError):
+                self.checkout()
+        self.assertUntouched()
+
+    def test_failed_outbox_write_is_undone(self):
+        with patch("app.crud.order_crud.enqueue_order_notifications", side_effect=RuntimeError("outbox unavailable")):
+            with self.assertRaises(RuntimeError):
+                self.checkout()
+        self.assertUntouched()
+
+    def test_failed_commit_is_undone(self):
+        with patch("app.crud.order_crud.commit_reservation", side_effect=RuntimeError("stock write failed")):
+            with self.assertRaises(RuntimeError):
+                self.checkout()
+        self.assertUntouched()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+from pymongo.errors import PyMongoError
+from support import connect_test_db, replica_set_available
+
+# Needs a replica set, e.g. docker-compose.replset.yml with MONGO_URI set.
+@unittest.skipUnless(replica_set_available(), "MONGO_URI does not point at a reachable replica set")
+class TestRunInTransaction(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        connect_test_db("checkout_transaction_test")
+        from mongoengine.connection import get_db
+        cls.collection = get_db()["transaction_probe"]
+
+    @classmethod
+    def tearDownClass(cls):
+        from mongoengine import disconnect
+        cls.collection.drop()
+        disconnect()
+
+    def setUp(self):
+        self.collection.delete_many({})
+        self.collection.insert_one({"_id": "stock", "quantity": 5})
+
+    def test_commits_all_writes(self):
+        from app.database import run_in_transaction
+
+        def place(session):
+            self.collection.update_one({"_id": "stock"}, {"$inc": {"quantity": -2}}, session=session)
+            self.collection.insert_one({"_id": "order"}, session=session)
+
+        run_in_transaction(place, max_retries=3)
+        self.assertEqual(self.collection.find_one({"_id": "stock"})["quantity"], 3)
+        self.assertIsNotNone(self.collection.find_one({"_id": "order"}))
+
+    def test_rolls_back_on_error(self):
+        from app.database import run_in_transaction
+
+        def place(session):
+            self.collection.update_one({"_id": "stock"}, {"$inc": {"quantity": -2}}, session=session)
+            self.collection.insert_one({"_id": "order"}, session=session)
+            raise ValueError("payment declined")
+
+        with self.assertRaises(ValueError):
+            run_in_transaction(place, max_retries=3)
+        self.assertEqual(self.collection.find_one({"_id": "stock"})["quantity"], 5)
+        self.assertIsNone(self.collection.find_one({"_id": "order"}))
+
+    def test_retries_transient_errors(self):
+        from app.database import run_in_transaction
+        attempts = []
+
+        def place(session):
+            attempts.append(1)
+            self.collection.update_one({"_id": "stock"}, {"$inc": {"quantity": -1}}, session=session)
+            if len(attempts) == 1:
+                error = PyMongoError("write conflict")
+                error._add_error_label("TransientTransactionError")
+                raise error
+
+        run_in_transaction(place, max_retries=3)
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(self.collection.find_one({"_id": "stock"})["quantity"], 4)
+
+if __name__ == "__main__":
+    unittest.main()
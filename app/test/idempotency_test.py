@@ -0,0 +1,108 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from fastapi import FastAPI, HTTPException
+from support import NO_MONGO, connect_test_db, mongo_available
+
+class FakeOrders:
+    def __init__(self, delay=0.0, error=None):
+        self.calls = 0
+        self.delay = delay
+        self.error = error
+
+    async def create_order_logic(self, order_data, current_buyer):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return {"order_id": f"order-{self.calls}", "payment_method": order_data.payment_method}
+
+@unittest.skipUnless(mongo_available(), NO_MONGO)
+class TestIdempotentCreateOrder(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        connect_test_db("idempotency_test")
+
+    @classmethod
+    def tearDownClass(cls):
+        from mongoengine import disconnect
+        from app.models.idempotency import IdempotencyRecord
+        from app.models.users import User
+        IdempotencyRecord.drop_collection()
+        User.drop_collection()
+        disconnect()
+
+    def setUp(self):
+        from app.dependencies import get_current_user
+        from app.models.idempotency import IdempotencyRecord
+        from app.models.users import Buyer, User
+        from app.router import order_router
+        IdempotencyRecord.objects.delete()
+        User.objects.delete()
+        buyer = Buyer(username="alice", email="alice@example.com", hashed_password="x", full_name="Alice").save()
+
+        self.app = FastAPI()
+        self.app.include_router(order_router.router, prefix="/api/v1/order")
+        self.app.dependency_overrides[get_current_user] = lambda: buyer
+        self.orders = FakeOrders()
+        patcher = patch.object(order_router, "orders", self.orders)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, *requests):
+        import httpx
+
+        async def send():
+            transport = httpx.ASGITransport(app=self.app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await asyncio.gather(*(
+                    client.post("/api/v1/order/", json=body, headers={"Idempotency-Key": key})
+                    for key, body in requests
+                ))
+
+        return asyncio.run(send())
+
+    def test_replays_the_stored_response(self):
+        first = self.post(("k1", {"payment_method": "cod"}))[0]
+        second = self.post(("k1", {"payment_method": "cod"}))[0]
+        self.assertEqual((first.status_code, second.status_code), (200, 200))
+        self.assertEqual(second.json(), first.json())
+        self.assertNotIn("Idempotent-Replayed", first.headers)
+        self.assertEqual(second.headers["Idempotent-Replayed"], "true")
+        self.assertEqual(self.orders.calls, 1)
+
+    def test_reusing_a_key_with_a_different_body_is_rejected(self):
+        self.post(("k1", {"payment_method": "cod"}))
+        response = self.post(("k1", {"payment_method": "online"}))[0]
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.orders.calls, 1)
+
+    def test_failed_attempt_releases_the_key(self):
+        self.orders.error = HTTPException(status_code=400, detail="Cart is empty")
+        self.assertEqual(self.post(("k1", {"payment_method": "cod"}))[0].status_code, 400)
+
+        self.orders.error = None
+        response = self.post(("k1", {"payment_method": "cod"}))[0]
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Idempotent-Replayed", response.headers)
+        self.assertEqual(self.orders.calls, 2)
+
+    def test_concurrent_duplicates_run_once(self):
+        self.orders.delay = 0.5
+        with patch("app.router.order_router.settings.IDEMPOTENCY_POLL_SECONDS", 0.05):
+            responses = self.post(*[("k1", {"payment_method": "cod"})] * 3)
+        self.assertEqual([response.status_code for response in responses], [200, 200, 200])
+        self.assertEqual(len({response.json()["order_id"] for response in responses}), 1)
+        self.assertEqual(self.orders.calls, 1)
+
+    def test_waiting_on_a_stuck_request_times_out(self):
+        self.orders.delay = 1.0
+        with patch("app.router.order_router.settings.IDEMPOTENCY_POLL_SECONDS", 0.05), \
+                patch("app.router.order_router.settings.IDEMPOTENCY_WAIT_SECONDS", 0.2):
+            responses = self.post(*[("k1", {"payment_method": "cod"})] * 2)
+        self.assertEqual(sorted(response.status_code for response in responses), [200, 409])
+        self.assertEqual(self.orders.calls, 1)
+
+if __name__ == "__main__":
+    unittest.main()
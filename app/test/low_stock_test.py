@@ -0,0 +1,83 @@
+import unittest
+from concurrent.futures import Future
+from app.utils.low_stock import LowStockAggregator
+from support import FakeTimer
+
+class TestLowStockAggregator(unittest.TestCase):
+
+    def setUp(self):
+        self.timer = FakeTimer(1000.0)
+        self.sent = []
+        self.fail = False
+        self.aggregator = LowStockAggregator(self.send_digest, window_seconds=3600, realert_seconds=60, timer=self.timer)
+
+    def tearDown(self):
+        self.aggregator.close()
+
+    def send_digest(self, seller_email, products):
+        if self.fail:
+            raise ConnectionError("smtp down")
+        self.sent.append((seller_email, dict(products)))
+
+    def test_batches_one_digest_per_seller(self):
+        self.aggregator.record("a@example.com", "Lamp", 4)
+        self.aggregator.record("a@example.com", "Desk", 2)
+        self.aggregator.record("a@example.com", "Lamp", 3)
+        self.aggregator.record("b@example.com", "Chair", 1)
+        self.aggregator.flush()
+
+        self.assertEqual(sorted(self.sent), [
+            ("a@example.com", {"Desk": 2, "Lamp": 3}),
+            ("b@example.com", {"Chair": 1}),
+        ])
+        self.assertEqual(self.aggregator.stats()["digests_sent"], 2)
+
+    def test_suppresses_realert_within_window_unless_sold_out(self):
+        self.aggregator.record("a@example.com", "Lamp", 4)
+        self.aggregator.flush()
+
+        self.timer.now += 30
+        self.aggregator.record("a@example.com", "Lamp", 3)
+        self.aggregator.record("a@example.com", "Desk", 0)
+        self.assertEqual(self.aggregator.stats()["suppressed"], 1)
+        self.aggregator.record("a@example.com", "Lamp", 0)
+        self.aggregator.flush()
+        self.assertEqual(self.sent[-1], ("a@example.com", {"Desk": 0, "Lamp": 0}))
+
+        self.timer.now += 61
+        self.aggregator.record("a@example.com", "Lamp", 5)
+        self.aggregator.flush()
+        self.assertEqual(self.sent[-1], ("a@example.com", {"Lamp": 5}))
+        self.assertEqual(self.aggregator.stats()["suppressed"], 1)
+
+    def test_failed_send_does_not_suppress_realert(self):
+        self.fail = True
+        self.aggregator.record("a@example.com", "Lamp", 4)
+        self.aggregator.flush()
+        self.assertEqual(self.aggregator.stats()["failed"], 1)
+
+        self.fail = False
+        self.aggregator.record("a@example.com", "Lamp", 3)
+        self.aggregator.flush()
+        self.assertEqual(self.sent, [("a@example.com", {"Lamp": 3})])
+        self.assertEqual(self.aggregator.stats()["suppressed"], 0)
+
+    def test_waits_for_queued_delivery_before_suppressing(self):
+        deliveries = []
+        aggregator = LowStockAggregator(lambda seller_email, products: deliveries.append(Future()) or deliveries[-1],
+                                        window_seconds=3600, realert_seconds=60, timer=self.timer)
+        aggregator.record("a@example.com", "Lamp", 4)
+        aggregator.flush()
+        deliveries[0].set_exception(ConnectionError("smtp down"))
+
+        aggregator.record("a@example.com", "Lamp", 3)
+        aggregator.flush()
+        deliveries[1].set_result(True)
+
+        aggregator.record("a@example.com", "Lamp", 2)
+        stats = aggregator.stats()
+        aggregator.close()
+        self.assertEqual((stats["failed"], stats["digests_sent"], stats["suppressed"]), (1, 1, 1))
+
+if __name__ == "__main__":
+    unittest.main()
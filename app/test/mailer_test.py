@@ -0,0 +1,110 @@
+import smtplib
+import socket
+import unittest
+from email.message import EmailMessage
+from app.utils.mailer import Mailer
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    Controller = None
+
+def build_message(index: int):
+    message = EmailMessage()
+    message["From"] = "shop@example.com"
+    message["To"] = f"buyer{index}@example.com"
+    message["Subject"] = f"Order {index}"
+    message.set_content("Thanks for your order")
+    return message
+
+class FlakySMTP:
+    instances = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.fail_next_send = not FlakySMTP.instances
+        FlakySMTP.instances.append(self)
+
+    def noop(self):
+        return (250, b"OK")
+
+    def send_message(self, message):
+        if self.fail_next_send:
+            self.fail_next_send = False
+            raise smtplib.SMTPServerDisconnected("connection dropped")
+        self.sent.append(message)
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+class TestMailerRetry(unittest.TestCase):
+
+    def setUp(self):
+        FlakySMTP.instances = []
+
+    def test_reconnects_and_resends_after_disconnect(self):
+        mailer = Mailer("localhost", 25, use_tls=False, pool_size=1, backoff_seconds=0, smtp_factory=FlakySMTP)
+        for index in range(3):
+            mailer.send(build_message(index))
+        mailer.join()
+        mailer.close()
+
+        delivered = [message for smtp in FlakySMTP.instances for message in smtp.sent]
+        self.assertEqual(len(delivered), 3)
+        self.assertEqual(mailer.stats()["retries"], 1)
+        self.assertEqual(mailer.stats()["failed"], 0)
+
+    def test_gives_up_after_max_retries(self):
+        class DeadSMTP(FlakySMTP):
+            def send_message(self, message):
+                raise smtplib.SMTPServerDisconnected("connection dropped")
+
+        mailer = Mailer("localhost", 25, use_tls=False, pool_size=1, max_retries=2, backoff_seconds=0, smtp_factory=DeadSMTP)
+        delivered = mailer.send(build_message(0))
+        mailer.join()
+        mailer.close()
+
+        self.assertIsInstance(delivered.exception(), smtplib.SMTPServerDisconnected)
+        self.assertEqual(mailer.stats()["failed"], 1)
+        self.assertEqual(mailer.stats()["retries"], 2)
+
+@unittest.skipIf(Controller is None, "aiosmtpd is not installed")
+class TestMailerAgainstLocalServer(unittest.TestCase):
+
+    class Handler:
+        def __init__(self):
+            self.messages = []
+            self.sessions = set()
+
+        async def handle_DATA(self, server, session, envelope):
+            self.messages.append(envelope)
+            self.sessions.add(id(session))
+            return "250 Message accepted for delivery"
+
+    def setUp(self):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+        self.handler = self.Handler()
+        self.controller = Controller(self.handler, hostname="127.0.0.1", port=self.port)
+        self.controller.start()
+
+    def tearDown(self):
+        self.controller.stop()
+
+    def test_batch_is_sent_over_one_connection(self):
+        mailer = Mailer("127.0.0.1", self.port, use_tls=False, pool_size=1, batch_size=10)
+        for index in range(5):
+            mailer.send(build_message(index))
+        mailer.join()
+        mailer.close()
+
+        self.assertEqual(len(self.handler.messages), 5)
+        self.assertEqual(len(self.handler.sessions), 1)
+        self.assertEqual(mailer.stats()["connections_opened"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+from datetime import datetime, timedelta
+from app.crud.outbox_crud import retry_delay
+from support import NO_MONGO, connect_test_db, mongo_available
+
+class TestRetryDelay(unittest.TestCase):
+
+    def test_doubles_per_attempt_up_to_the_cap(self):
+        delays = [retry_delay(attempts, backoff_seconds=5, max_backoff_seconds=60) for attempts in range(1, 7)]
+        self.assertEqual(delays, [5, 10, 20, 40, 60, 60])
+
+@unittest.skipUnless(mongo_available(), NO_MONGO)
+class TestOutboxLeases(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        connect_test_db("outbox_test")
+
+    @classmethod
+    def tearDownClass(cls):
+        from mongoengine import disconnect
+        from app.models.outbox import OutboxMessage
+        OutboxMessage.drop_collection()
+        disconnect()
+
+    def setUp(self):
+        from app.models.outbox import OutboxMessage
+        OutboxMessage.objects.delete()
+        self.message = OutboxMessage(kind="order_sms", payload={"order_id": "o1"}).save()
+
+    def reload(self):
+        from app.models.outbox import OutboxMessage
+        return OutboxMessage.objects.get(id=self.message.id)
+
+    def fail(self, message, max_attempts=3):
+        from app.crud.outbox_crud import mark_failed
+        return mark_failed(message, "boom", max_attempts=max_attempts, backoff_seconds=5, max_backoff_seconds=60)
+
+    def test_claim_takes_a_due_message_once(self):
+        from app.crud.outbox_crud import claim_next_message
+        claimed = claim_next_message(lease_seconds=60)
+        self.assertEqual((claimed.id, claimed.status, claimed.attempts), (self.message.id, "processing", 1))
+        self.assertIsNone(claim_next_message(lease_seconds=60))
+
+    def test_failure_schedules_a_retry_with_backoff(self):
+        from app.crud.outbox_crud import claim_next_message
+        before = datetime.now()
+        self.assertEqual(self.fail(claim_next_message(lease_seconds=60)), "pending")
+
+        stored = self.reload()
+        self.assertEqual((stored.status, stored.last_error), ("pending", "boom"))
+        self.assertGreaterEqual(stored.next_attempt_at, before + timedelta(seconds=4))
+        self.assertIsNone(claim_next_message(lease_seconds=60))
+
+    def test_dead_letters_after_max_attempts(self):
+        from app.crud.outbox_crud import claim_next_message
+        from app.models.outbox import OutboxMessage
+        for _ in range(2):
+            self.assertEqual(self.fail(claim_next_message(lease_seconds=60)), "pending")
+            OutboxMessage.objects(id=self.message.id).update_one(set__next_attempt_at=datetime.now())
+        self.assertEqual(self.fail(claim_next_message(lease_seconds=60)), "dead")
+        self.assertEqual(self.reload().status, "dead")
+        self.assertIsNone(claim_next_message(lease_seconds=60))
+
+    def test_worker_that_lost_its_lease_cannot_settle(self):
+        from app.crud.outbox_crud import claim_next_message, mark_done
+        stale = claim_next_message(lease_seconds=-1)
+        current = claim_next_message(lease_seconds=60)
+        self.assertEqual((current.id, current.attempts), (stale.id, 2))
+
+        self.assertFalse(mark_done(stale))
+        self.assertEqual(self.fail(stale), "lost")
+        self.assertEqual(self.reload().status, "processing")
+
+        self.assertTrue(mark_done(current))
+        self.assertEqual(self.reload().status, "done")
+
+if __name__ == "__main__":
+    unittest.main()
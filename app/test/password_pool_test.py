@@ -0,0 +1,47 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.password_pool import PasswordPool, PasswordPoolBusy
+
+class TestPasswordPool(unittest.TestCase):
+
+    def test_hash_and_verify_round_trip(self):
+        pool = PasswordPool(workers=1, max_pending=4)
+        self.addCleanup(pool.shutdown)
+
+        async def scenario():
+            hashed = await pool.hash("s3cret")
+            return hashed, await pool.verify("s3cret", hashed), await pool.verify("wrong", hashed)
+
+        hashed, good, bad = asyncio.run(scenario())
+        self.assertNotEqual(hashed, "s3cret")
+        self.assertTrue(good)
+        self.assertFalse(bad)
+        self.assertEqual(pool.stats()["completed"], 3)
+
+    def test_rejects_calls_beyond_max_pending(self):
+        pool = PasswordPool(workers=1, max_pending=1)
+        pool._executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(pool.shutdown)
+        release = threading.Event()
+
+        def slow_hash():
+            release.wait(5)
+            return "hashed", time.time()
+
+        async def scenario():
+            first = asyncio.ensure_future(pool._submit(slow_hash))
+            await asyncio.sleep(0)
+            with self.assertRaises(PasswordPoolBusy):
+                await pool._submit(slow_hash)
+            release.set()
+            return await first
+
+        self.assertEqual(asyncio.run(scenario()), "hashed")
+        stats = pool.stats()
+        self.assertEqual((stats["pending"], stats["completed"], stats["rejected"]), (0, 1, 1))
+
+if __name__ == "__main__":
+    unittest.main()
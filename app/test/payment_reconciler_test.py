@@ -0,0 +1,95 @@
+import asyncio
+import unittest
+from app.utils.payment_providers import FakeProvider, PaymentProvider, RateLimiter, fetch_checkout_outcomes
+from app.workers.payment_reconciler import reconcile
+
+class FakeOrders:
+    def __init__(self, sessions):
+        self.pending = dict(enumerate(sessions, start=1))
+        self.pages = []
+        self.applied = []
+
+    def load_page(self, after, limit):
+        self.pages.append(after)
+        ids = sorted(order_id for order_id in self.pending if after is None or order_id > after)[:limit]
+        return [(order_id, self.pending[order_id]) for order_id in ids]
+
+    def apply(self, outcomes):
+        self.applied.append(dict(outcomes))
+        counts = {"succeeded": 0, "failed": 0, "unchanged": 0}
+        for order_id, session_id in list(self.pending.items()):
+            if session_id in outcomes:
+                counts[outcomes[session_id]] += 1
+                del self.pending[order_id]
+        return counts
+
+class TestFetchCheckoutOutcomes(unittest.TestCase):
+
+    def test_providers_must_implement_checkout_status(self):
+        class Incomplete(PaymentProvider):
+            pass
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_collects_settled_sessions_only(self):
+        provider = FakeProvider({"cs_paid": "succeeded", "cs_expired": "failed", "cs_open": None})
+        outcomes, errors = asyncio.run(fetch_checkout_outcomes(provider, ["cs_paid", "cs_expired", "cs_open"], concurrency=4, rate=0))
+        self.assertEqual(outcomes, {"cs_paid": "succeeded", "cs_expired": "failed"})
+        self.assertEqual(errors, 0)
+
+    def test_provider_errors_leave_session_pending(self):
+        provider = FakeProvider({"cs_paid": "succeeded", "cs_broken": "succeeded"}, errors={"cs_broken"})
+        outcomes, errors = asyncio.run(fetch_checkout_outcomes(provider, ["cs_paid", "cs_broken"], concurrency=2, rate=0))
+        self.assertEqual(outcomes, {"cs_paid": "succeeded"})
+        self.assertEqual(errors, 1)
+
+    def test_concurrency_is_bounded(self):
+        session_ids = [f"cs_{i}" for i in range(20)]
+        provider = FakeProvider({session_id: "succeeded" for session_id in session_ids}, delay=0.01)
+        outcomes, _ = asyncio.run(fetch_checkout_outcomes(provider, session_ids, concurrency=3, rate=0))
+        self.assertEqual(len(outcomes), 20)
+        self.assertEqual(provider.max_in_flight, 3)
+
+    def test_rate_limit_spaces_requests(self):
+        session_ids = [f"cs_{i}" for i in range(6)]
+        provider = FakeProvider({})
+        asyncio.run(fetch_checkout_outcomes(provider, session_ids, concurrency=6, rate=50))
+        started = sorted(at for _, at in provider.calls)
+        # Six calls at 50/s need at least five 20 ms gaps.
+        self.assertGreaterEqual(started[-1] - started[0], 0.09)
+
+class TestReconcile(unittest.TestCase):
+
+    def setUp(self):
+        self.orders = FakeOrders(["cs_paid", "cs_open", "cs_expired", "cs_broken", "cs_late"])
+        self.provider = FakeProvider({"cs_paid": "succeeded", "cs_expired": "failed", "cs_late": "succeeded"}, errors={"cs_broken"})
+
+    def reconcile(self, dry_run=False):
+        return asyncio.run(reconcile(self.provider, self.orders.load_page, page_size=2, concurrency=2, rate=0,
+                                     dry_run=dry_run, apply=self.orders.apply))
+
+    def test_pages_through_orders_and_applies_each_page(self):
+        totals = self.reconcile()
+        self.assertEqual(self.orders.pages, [None, 2, 4, 5])
+        self.assertEqual(self.orders.applied, [{"cs_paid": "succeeded"}, {"cs_expired": "failed"}, {"cs_late": "succeeded"}])
+        self.assertEqual(totals, {"checked": 5, "succeeded": 2, "failed": 1, "unchanged": 0, "errors": 1})
+        self.assertEqual(sorted(self.orders.pending.values()), ["cs_broken", "cs_open"])
+
+    def test_dry_run_reports_without_applying(self):
+        totals = self.reconcile(dry_run=True)
+        self.assertEqual(self.orders.applied, [])
+        self.assertEqual((totals["checked"], totals["succeeded"], totals["failed"]), (5, 2, 1))
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_unlimited_rate_does_not_wait(self):
+        limiter = RateLimiter(0)
+
+        async def burst():
+            for _ in range(100):
+                await limiter.acquire()
+
+        asyncio.run(asyncio.wait_for(burst(), timeout=1))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+from fastapi import HTTPException
+from app.auth import create_access_token
+from app.dependencies import get_current_user
+from app.utils.principal_cache import principal_cache
+
+class TestGetCurrentUser(unittest.TestCase):
+
+    def setUp(self):
+        principal_cache.clear()
+        self.user = SimpleNamespace(username="alice")
+        self.users = patch("app.dependencies.users", get_user_by_username=AsyncMock(return_value=self.user))
+        self.revoked = patch("app.dependencies.is_token_revoked", return_value=False)
+        self.users_mock = self.users.start()
+        self.revoked_mock = self.revoked.start()
+        self.addCleanup(self.users.stop)
+        self.addCleanup(self.revoked.stop)
+        self.addCleanup(principal_cache.clear)
+
+    def authenticate(self, token):
+        return asyncio.run(get_current_user(token))
+
+    def test_loads_the_user_once_then_serves_from_cache(self):
+        token = create_access_token({"sub": "alice"})
+        self.assertIs(self.authenticate(token), self.user)
+        self.assertIs(self.authenticate(token), self.user)
+        self.users_mock.get_user_by_username.assert_awaited_once_with("alice")
+
+    def test_reloads_after_invalidation(self):
+        token = create_access_token({"sub": "alice"})
+        self.authenticate(token)
+        principal_cache.pop("alice")
+        self.authenticate(token)
+        self.assertEqual(self.users_mock.get_user_by_username.await_count, 2)
+
+    def test_revoked_token_is_rejected_even_when_cached(self):
+        token = create_access_token({"sub": "alice"})
+        self.authenticate(token)
+        self.revoked_mock.return_value = True
+        with self.assertRaises(HTTPException) as raised:
+            self.authenticate(token)
+        self.assertEqual(raised.exception.detail, "You have been logged out")
+
+    def test_invalid_token_never_reaches_the_store(self):
+        with self.assertRaises(HTTPException) as raised:
+            self.authenticate("not-a-jwt")
+        self.assertEqual(raised.exception.status_code, 401)
+        self.users_mock.get_user_by_username.assert_not_awaited()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from fastapi import HTTPException
+from support import NO_MONGO, connect_test_db, mongo_available
+
+@unittest.skipUnless(mongo_available(), NO_MONGO)
+class TestRefreshTokenRotation(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        connect_test_db("refresh_token_test")
+
+    @classmethod
+    def tearDownClass(cls):
+        from mongoengine import disconnect
+        from app.models.tokens import RefreshToken
+        from app.models.users import User
+        RefreshToken.drop_collection()
+        User.drop_collection()
+        disconnect()
+
+    def setUp(self):
+        from app.models.tokens import RefreshToken
+        from app.models.users import Buyer, User
+        RefreshToken.objects.delete()
+        User.objects.delete()
+        Buyer(username="alice", email="alice@example.com", hashed_password="x", full_name="Alice").save()
+
+    def assertRejected(self, token):
+        from app.crud.token_crud import rotate_refresh_token
+        with self.assertRaises(HTTPException) as raised:
+            rotate_refresh_token(token)
+        self.assertEqual(raised.exception.status_code, 401)
+
+    def test_rotation_issues_a_new_token_in_the_same_family(self):
+        from app.crud.token_crud import issue_refresh_token, rotate_refresh_token
+        token, family_id = issue_refresh_token("alice")
+        user, new_token, new_family_id = rotate_refresh_token(token)
+        self.assertEqual((user.username, new_family_id), ("alice", family_id))
+        self.assertNotEqual(new_token, token)
+        self.assertEqual(rotate_refresh_token(new_token)[2], family_id)
+
+    def test_reusing_a_rotated_token_revokes_the_family(self):
+        from app.crud.token_crud import issue_refresh_token, rotate_refresh_token
+        token, _ = issue_refresh_token("alice")
+        _, new_token, _ = rotate_refresh_token(token)
+
+        self.assertRejected(token)
+        self.assertRejected(new_token)
+
+    def test_revoked_family_cannot_refresh(self):
+        from app.crud.token_crud import issue_refresh_token, revoke_token_family, rotate_refresh_token
+        token, family_id = issue_refresh_token("alice")
+        other_token, _ = issue_refresh_token("alice")
+        revoke_token_family(family_id)
+
+        self.assertRejected(token)
+        self.assertEqual(rotate_refresh_token(other_token)[0].username, "alice")
+
+    def test_unknown_token_is_rejected(self):
+        self.assertRejected("never-issued")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from app.utils.payment_providers import FakeProvider
+from support import NO_MONGO, connect_test_db, mongo_available
+
+@unittest.skipUnless(mongo_available(), NO_MONGO)
+class TestReservationSweeper(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        connect_test_db("reservation_sweeper_test")
+
+    @classmethod
+    def tearDownClass(cls):
+        from mongoengine import disconnect
+        from mongoengine.connection import get_db
+        get_db().client.drop_database("reservation_sweeper_test")
+        disconnect()
+
+    def setUp(self):
+        from mongoengine.connection import get_db
+        from app.models.users import Address, Buyer, Seller
+        from app.models.products import Brand, Category, Product
+        for name in get_db().list_collection_names():
+            get_db()[name].delete_many({})
+        seller = Seller(username="shop", email="shop@example.com", hashed_password="x", full_name="Shop").save()
+        self.buyer = Buyer(username="alice", email="alice@example.com", hashed_password="x", full_name="Alice").save()
+        self.address = Address(address_line1="1 Main St", city="Pune", state="MH", postal_code="411001", country="IN")
+        self.product = Product(name="Lamp", price=Decimal("20.00"), stock=20, category=Category(name="Home").save(),
+                               brand=Brand(name="Acme").save(), seller=seller).save()
+
+    def hold(self, quantity, minutes_left):
+        from app.crud.inventory_crud import reserve_stock
+        expires_at = datetime.now() + timedelta(minutes=minutes_left)
+        return reserve_stock([(self.product, quantity)], expires_at=expires_at), expires_at
+
+    def place(self, session_id, quantity=1, minutes_left=-10, payment_status="pending"):
+        from app.models.order import Charge, Order, OrderLine
+        reservation_id, expires_at = self.hold(quantity, minutes_left)
+        order = Order(
+            buyer=self.buyer, items=[OrderLine(product=self.product, quantity=quantity)], total_price=Decimal("20.00"),
+            payment_method="online", payment_status=payment_status, delivery_address=self.address,
+            charge=Charge(amount=Decimal("20.00"), stripe_checkout_id=session_id),
+            reservation_id=reservation_id, reservation_expires_at=expires_at,
+        )
+        order.save()
+        return order
+
+    def sweep(self, provider):
+        from app.workers.reservation_sweeper import sweep
+        return asyncio.run(sweep(provider, grace_seconds=60, batch_size=2, concurrency=2, rate=0))
+
+    def held(self):
+        self.product.reload()
+        return self.product.stock, sorted(hold.quantity for hold in self.product.reservations)
+
+    def test_asks_the_provider_before_failing_an_expired_order(self):
+        expired = self.place("cs_expired", quantity=1)
+        paid = self.place("cs_paid", quantity=2)
+        still_open = self.place("cs_open", quantity=3)
+        unreachable = self.place("cs_error", quantity=4)
+        fresh = self.place("cs_fresh", quantity=5, minutes_left=30)
+        provider = FakeProvider({"cs_expired": "failed", "cs_paid": "succeeded"}, errors={"cs_error"})
+
+        totals = self.sweep(provider)
+
+        self.assertEqual(sorted(session_id for session_id, _ in provider.calls), ["cs_error", "cs_expired", "cs_open", "cs_paid"])
+        self.assertEqual((totals["checked"], totals["succeeded"], totals["failed"], totals["errors"]), (4, 1, 1, 1))
+        for order, status in ((expired, "failed"), (paid, "succeeded"), (still_open, "pending"), (unreachable, "pending"), (fresh, "pending")):
+            order.reload()
+            self.assertEqual(order.payment_status, status)
+        # 20 - 2 paid and kept; 3, 4 and 5 still held; 1 returned.
+        self.assertEqual(self.held(), (6, [3, 4, 5]))
+
+    def test_a_payment_after_the_grace_period_still_succeeds(self):
+        order = self.place("cs_late", quantity=2, minutes_left=-24 * 60)
+        self.sweep(FakeProvider({"cs_late": "succeeded"}))
+        order.reload()
+        self.assertEqual(order.payment_status, "succeeded")
+        self.assertEqual(self.held(), (18, []))
+
+    def test_settles_holds_left_without_a_pending_order(self):
+        self.hold(1, minutes_left=-10)
+        self.place("cs_failed", quantity=2, payment_status="failed")
+        self.place("cs_paid", quantity=3, payment_status="succeeded")
+        self.hold(4, minutes_left=30)
+
+        totals = self.sweep(FakeProvider({}))
+
+        self.assertEqual((totals["holds_released"], totals["holds_committed"]), (2, 1))
+        self.assertEqual(self.held(), (13, [4]))
+
+if __name__ == "__main__":
+    unittest.main()
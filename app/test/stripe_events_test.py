@@ -0,0 +1,173 @@
+import hashlib
+import hmac
+import json
+import time
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.crud.payment_crud import event_outcome, fold_events
+from app.models.payments import StripeEvent
+from app.schemas.orderschema import PaymentStatus
+from support import NO_MONGO, connect_test_db, mongo_available
+
+def stripe_event(event_type, session_id="cs_1", payment_status="paid", event_id=None):
+    return {
+        "id": event_id or f"evt_{session_id}_{event_type}",
+        "object": "event",
+        "type": event_type,
+        "created": int(time.time()),
+        "data": {"object": {"id": session_id, "object": "checkout.session", "payment_status": payment_status}},
+    }
+
+def queued(event_type, session_id="cs_1", payment_status="paid", event_id=None):
+    return StripeEvent(
+        id=event_id,
+        event_id=f"evt_{event_id}",
+        type=event_type,
+        checkout_session_id=session_id,
+        payload={"payment_status": payment_status},
+    )
+
+class TestEventFolding(unittest.TestCase):
+
+    def test_event_outcome(self):
+        self.assertEqual(event_outcome(queued("checkout.session.completed")), PaymentStatus.SUCCEEDED)
+        self.assertIsNone(event_outcome(queued("checkout.session.completed", payment_status="unpaid")))
+        self.assertEqual(event_outcome(queued("checkout.session.async_payment_succeeded", payment_status="unpaid")), PaymentStatus.SUCCEEDED)
+        self.assertEqual(event_outcome(queued("checkout.session.async_payment_failed")), PaymentStatus.FAILED)
+        self.assertEqual(event_outcome(queued("checkout.session.expired")), PaymentStatus.FAILED)
+        self.assertIsNone(event_outcome(queued("payment_intent.created")))
+        self.assertIsNone(event_outcome(queued("checkout.session.expired", session_id=None)))
+
+    def test_folds_to_one_outcome_per_session_latest_wins(self):
+        outcomes, applied, ignored = fold_events([
+            queued("checkout.session.completed", "cs_1", payment_status="unpaid", event_id=1),
+            queued("checkout.session.async_payment_failed", "cs_1", event_id=2),
+            queued("checkout.session.completed", "cs_2", event_id=3),
+            queued("customer.created", None, event_id=4),
+            queued("checkout.session.async_payment_succeeded", "cs_1", event_id=5),
+        ])
+        self.assertEqual(outcomes, {"cs_1": PaymentStatus.SUCCEEDED, "cs_2": PaymentStatus.SUCCEEDED})
+        self.assertEqual(applied, [2, 3, 5])
+        self.assertEqual(ignored, [1, 4])
+
+class TestStripeWebhook(unittest.TestCase):
+    secret = "whsec_test"
+
+    def setUp(self):
+        from app.router import order_router
+        app = FastAPI()
+        app.include_router(order_router.router, prefix="/api/v1/order")
+        self.client = TestClient(app)
+        self.payments = patch.object(order_router, "payments", record_stripe_event=AsyncMock(return_value=True))
+        self.payments_mock = self.payments.start()
+        self.addCleanup(self.payments.stop)
+
+    def post(self, payload: bytes, signature: str):
+        return self.client.post("/api/v1/order/stripe-webhook", content=payload, headers={"stripe-signature": signature})
+
+    def sign(self, payload: bytes, secret: str = None):
+        timestamp = int(time.time())
+        signature = hmac.new((secret or self.secret).encode(), f"{timestamp}.".encode() + payload, hashlib.sha256).hexdigest()
+        return f"t={timestamp},v1={signature}"
+
+    def test_queues_a_correctly_signed_event(self):
+        payload = json.dumps(stripe_event("checkout.session.completed")).encode()
+        with patch("app.router.order_router.settings.STRIPE_WEBHOOK_SECRET", self.secret):
+            response = self.post(payload, self.sign(payload))
+        self.assertEqual(response.status_code, 200)
+        self.payments_mock.record_stripe_event.assert_awaited_once()
+
+    def test_rejects_a_bad_signature(self):
+        payload = json.dumps(stripe_event("checkout.session.completed")).encode()
+        with patch("app.router.order_router.settings.STRIPE_WEBHOOK_SECRET", self.secret):
+            response = self.post(payload, self.sign(payload, secret="whsec_other"))
+        self.assertEqual(response.status_code, 400)
+        self.payments_mock.record_stripe_event.assert_not_awaited()
+
+    def test_refuses_events_while_the_secret_is_unset(self):
+        payload = json.dumps(stripe_event("checkout.session.completed")).encode()
+        with patch("app.router.order_router.settings.STRIPE_WEBHOOK_SECRET", ""):
+            response = self.post(payload, self.sign(payload, secret=""))
+        self.assertEqual(response.status_code, 503)
+        self.payments_mock.record_stripe_event.assert_not_awaited()
+
+@unittest.skipUnless(mongo_available(), NO_MONGO)
+class TestApplyPaymentOutcomes(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        connect_test_db("stripe_events_test")
+
+    @classmethod
+    def tearDownClass(cls):
+        from mongoengine import disconnect
+        from mongoengine.connection import get_db
+        get_db().client.drop_database("stripe_events_test")
+        disconnect()
+
+    def setUp(self):
+        from mongoengine.connection import get_db
+        from app.models.users import Address, Buyer, Seller
+        from app.models.products import Brand, Category, Product
+        for name in get_db().list_collection_names():
+            get_db()[name].delete_many({})
+        seller = Seller(username="shop", email="shop@example.com", hashed_password="x", full_name="Shop").save()
+        self.buyer = Buyer(username="alice", email="alice@example.com", hashed_password="x", full_name="Alice").save()
+        self.address = Address(address_line1="1 Main St", city="Pune", state="MH", postal_code="411001", country="IN")
+        self.product = Product(name="Lamp", price=Decimal("20.00"), stock=10, category=Category(name="Home").save(),
+                               brand=Brand(name="Acme").save(), seller=seller).save()
+
+    def place(self, session_id, quantity=2):
+        from app.crud.inventory_crud import reserve_stock
+        from app.models.order import Charge, Order, OrderLine
+        expires_at = datetime.now() + timedelta(minutes=45)
+        order = Order(
+            buyer=self.buyer, items=[OrderLine(product=self.product, quantity=quantity)], total_price=Decimal("40.00"),
+            payment_method="online", delivery_address=self.address, charge=Charge(amount=Decimal("40.00"), stripe_checkout_id=session_id),
+            reservation_id=reserve_stock([(self.product, quantity)], expires_at=expires_at), reservation_expires_at=expires_at,
+        )
+        order.save()
+        return order
+
+    def test_redelivered_events_are_recorded_once(self):
+        from app.crud.payment_crud import record_stripe_event
+        event = stripe_event("checkout.session.completed", event_id="evt_1")
+        self.assertTrue(record_stripe_event(event))
+        self.assertFalse(record_stripe_event(event))
+        self.assertEqual(StripeEvent.objects.count(), 1)
+
+    def test_settles_pending_orders_once(self):
+        from app.crud.payment_crud import apply_payment_outcomes
+        from app.models.outbox import OutboxMessage
+        paid = self.place("cs_paid")
+        self.place("cs_unpaid", quantity=3)
+
+        counts = apply_payment_outcomes({"cs_paid": "succeeded", "cs_unpaid": "failed"})
+        self.assertEqual(counts, {"succeeded": 1, "failed": 1, "unchanged": 0})
+        self.product.reload()
+        self.assertEqual((self.product.stock, self.product.reservations), (8, []))
+        self.assertEqual(OutboxMessage.objects(payload__order_id=str(paid.id)).count(), 2)
+
+        counts = apply_payment_outcomes({"cs_paid": "failed", "cs_unpaid": "failed"})
+        self.assertEqual(counts, {"succeeded": 0, "failed": 0, "unchanged": 2})
+        paid.reload()
+        self.product.reload()
+        self.assertEqual((paid.payment_status, self.product.stock), ("succeeded", 8))
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+
+    def test_flags_a_payment_on_a_failed_order(self):
+        from app.crud.payment_crud import apply_payment_outcomes
+        order = self.place("cs_late")
+        apply_payment_outcomes({"cs_late": "failed"})
+        with self.assertLogs("app.crud.payment_crud", level="ERROR"):
+            counts = apply_payment_outcomes({"cs_late": "succeeded"})
+        self.assertEqual(counts["unchanged"], 1)
+        order.reload()
+        self.assertEqual((order.payment_status, order.payment_review), ("failed", "paid_after_failure"))
+
+if __name__ == "__main__":
+    unittest.main()
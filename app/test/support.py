@@ -0,0 +1,48 @@
+# Shared helpers for the tests in this directory.
+#
+# Database tests run against MONGO_URI when it is set. Without it they fall
+# back to an in-memory mongomock client (pip install -r requirement-dev.txt),
+# and only skip when neither is available. Transactions need a real replica
+# set, so those tests use replica_set_available and never fall back.
+import os
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+from mongoengine import connect
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+MONGO_URI = os.environ.get("MONGO_URI")
+
+def _ping(check):
+    try:
+        with MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000) as client:
+            return check(client)
+    except PyMongoError:
+        return False
+
+def mongo_available():
+    if MONGO_URI:
+        return _ping(lambda client: bool(client.admin.command("ping")))
+    return mongomock is not None
+
+def replica_set_available():
+    if not MONGO_URI:
+        return False
+    return _ping(lambda client: "setName" in client.admin.command("hello"))
+
+def connect_test_db(name: str):
+    if MONGO_URI:
+        return connect(db=name, host=MONGO_URI, alias="default")
+    return connect(db=name, host="mongodb://localhost", alias="default", mongo_client_class=mongomock.MongoClient)
+
+NO_MONGO = "set MONGO_URI to a reachable MongoDB or install mongomock"
+
+class FakeTimer:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
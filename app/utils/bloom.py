@@ -0,0 +1,25 @@
+import hashlib
+import math
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.sha256(key.encode()).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:16], "big") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
@@ -0,0 +1,62 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at > self._timer():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl: float = None):
+        if ttl is None:
+            ttl = self.ttl
+        with self._lock:
+            self._entries[key] = (value, self._timer() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, _MISSING)
+            return default if entry is _MISSING else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
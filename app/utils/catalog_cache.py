@@ -0,0 +1,63 @@
+from app.models.products import Category, Brand, Offer
+from app.utils.cache import TTLCache
+from app.config import settings
+
+CACHED_MODELS = (Category, Brand, Offer)
+
+# Per-worker and only invalidated on the worker that made the write, so
+# other workers can serve an entry up to `ttl` seconds stale. Use it for
+# catalog display only; checkout and anything that sets or snapshots a price
+# reads offers live.
+class CatalogCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = TTLCache(maxsize, ttl)
+
+    def handles(self, model) -> bool:
+        return model in CACHED_MODELS
+
+    def get_by_id(self, model, object_id):
+        document = self._entries.get((model.__name__, "id", object_id))
+        if document is None:
+            document = model.objects.get(id=object_id)
+            self.put(document)
+        return document
+
+    def get_by_name(self, model, name: str):
+        document = self._entries.get((model.__name__, "name", name))
+        if document is None:
+            document = model.objects.get(name=name)
+            self.put(document)
+        return document
+
+    def get_many(self, model, ids):
+        found = {}
+        missing = []
+        for object_id in ids:
+            document = self._entries.get((model.__name__, "id", object_id))
+            if document is None:
+                missing.append(object_id)
+            else:
+                found[object_id] = document
+        if missing:
+            for document in model.objects(id__in=missing):
+                self.put(document)
+                found[document.id] = document
+        return found
+
+    def put(self, document):
+        model_name = type(document).__name__
+        self._entries.set((model_name, "id", document.id), document)
+        self._entries.set((model_name, "name", document.name), document)
+
+    def invalidate(self, document):
+        model_name = type(document).__name__
+        self._entries.pop((model_name, "id", document.id))
+        self._entries.pop((model_name, "name", document.name))
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return self._entries.stats()
+
+catalog_cache = CatalogCache(settings.CATALOG_CACHE_SIZE, settings.CATALOG_CACHE_TTL_SECONDS)
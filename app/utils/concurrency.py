@@ -0,0 +1,36 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.config import settings
+
+_executor = ThreadPoolExecutor(max_workers=settings.BLOCKING_IO_WORKERS, thread_name_prefix="blocking-io")
+_lock = threading.Lock()
+_in_flight = 0
+
+def _track(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global _in_flight
+        with _lock:
+            _in_flight += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with _lock:
+                _in_flight -= 1
+    return wrapper
+
+async def run_blocking(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(_track(func), *args, **kwargs))
+
+def executor_stats():
+    return {
+        "max_workers": settings.BLOCKING_IO_WORKERS,
+        "in_flight": _in_flight,
+        "queued": _executor._work_queue.qsize(),
+    }
+
+def shutdown_executor():
+    _executor.shutdown(wait=False, cancel_futures=True)
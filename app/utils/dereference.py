@@ -0,0 +1,51 @@
+from collections import defaultdict
+from bson import DBRef
+from mongoengine.base import BaseDocument
+from app.utils.catalog_cache import catalog_cache
+
+# Resolves ReferenceFields for a batch of documents with one `$in` query per
+# referenced collection. Paths may be dotted ("product.seller") to walk
+# through references that were resolved by an earlier segment.
+#
+# Catalog documents come from the per-worker catalog cache, which can lag
+# writes made on another worker by up to its TTL. Anything that charges or
+# snapshots prices passes `cached=False` to read them live.
+def resolve_references(documents, *paths, cached: bool = True):
+    documents = [document for document in documents if document is not None]
+    for path in paths:
+        targets = documents
+        for name in path.split("."):
+            targets = _resolve_field(targets, name, cached)
+    return documents
+
+def _fetch(document_type, ids, cached: bool):
+    if cached and catalog_cache.handles(document_type):
+        return catalog_cache.get_many(document_type, ids)
+    return {document.id: document for document in document_type.objects(id__in=ids)}
+
+def _resolve_field(documents, name, cached: bool):
+    if not documents:
+        return []
+
+    document_type = documents[0]._fields[name].document_type
+    pending = defaultdict(list)
+    resolved = {}
+
+    for document in documents:
+        value = document._data.get(name)
+        if isinstance(value, DBRef):
+            pending[value.id].append(document)
+        elif isinstance(value, BaseDocument):
+            resolved[id(value)] = value
+
+    if pending:
+        identity_map = _fetch(document_type, list(pending), cached)
+        for object_id, owners in pending.items():
+            target = identity_map.get(object_id)
+            if target is None:
+                continue
+            for owner in owners:
+                owner._data[name] = target
+            resolved[id(target)] = target
+
+    return list(resolved.values())
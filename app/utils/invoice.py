@@ -1,7 +1,6 @@
 import os
 from app.schemas.orderschema import OrderResponse
 from jinja2 import Template
-import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from twilio.rest import Client
@@ -15,6 +14,21 @@ from reportlab.lib.colors import orange, white
 import os
 from datetime import datetime
 from app.config import settings
+from app.utils.mailer import Mailer
+from app.utils.low_stock import LowStockAggregator
+
+mailer = Mailer(
+    settings.SMTP_HOST,
+    settings.SMTP_PORT,
+    username=settings.SENDER_EMAIL,
+    password=settings.EMAIL_PASSWORD,
+    use_tls=settings.SMTP_USE_TLS,
+    pool_size=settings.SMTP_POOL_SIZE,
+    batch_size=settings.SMTP_BATCH_SIZE,
+    max_retries=settings.SMTP_MAX_RETRIES,
+    backoff_seconds=settings.SMTP_RETRY_BACKOFF_SECONDS,
+    idle_timeout=settings.SMTP_IDLE_TIMEOUT_SECONDS,
+)
 
 def send_sms_notification(phone_number, message_body):
     account_sid= settings.ACCOUNT_SID
@@ -179,7 +193,6 @@ def generate_invoice_pdf(order_data, output_dir="static/invoices"):
 
 def send_email_with_invoice(to_email, subject, order_data: OrderResponse, attachment_path: str):
     sender_email = settings.SENDER_EMAIL
-    password = settings.EMAIL_PASSWORD
 
     with open('app/templates/invoice_temp.html', 'r') as file:
         template = Template(file.read())
@@ -211,17 +224,17 @@ def send_email_with_invoice(to_email, subject, order_data: OrderResponse, attach
         part.add_header('Content-Disposition', 'attachment', filename=os.path.basename(attachment_path))
         msg.attach(part)
 
-    with smtplib.SMTP('smtp.gmail.com', 587) as server:
-        server.starttls()
-        server.login(sender_email, password)
-        server.send_message(msg)
+    return mailer.send(msg)
 
-def send_low_stock_email(seller_email: str, product_name: str):
+def send_low_stock_digest(seller_email: str, products: dict):
     sender_email = settings.SENDER_EMAIL
-    password = settings.EMAIL_PASSWORD
 
-    subject = f"Low Stock Alert: {product_name}"
-    body = f"The stock of your product '{product_name}' is below 10. Please replenish your stock."
+    if len(products) == 1:
+        subject = f"Low Stock Alert: {next(iter(products))}"
+    else:
+        subject = f"Low Stock Alert: {len(products)} products"
+    lines = [f"- {name}: {stock} left" for name, stock in sorted(products.items())]
+    body = f"The stock of the following products is below {settings.LOW_STOCK_THRESHOLD}. Please replenish your stock.\n\n" + "\n".join(lines)
 
     message = MIMEMultipart()
     message['From'] = sender_email
@@ -229,11 +242,10 @@ def send_low_stock_email(seller_email: str, product_name: str):
     message['Subject'] = subject
     message.attach(MIMEText(body, 'plain'))
 
-    try:
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            server.starttls()  
-            server.login(sender_email, password)
-            server.sendmail(sender_email, seller_email, message.as_string())
-        print(f"Low stock email sent to {seller_email}")
-    except Exception as e:
-        print(f"Failed to send email: {e}")
\ No newline at end of file
+    return mailer.send(message)
+
+low_stock_alerts = LowStockAggregator(
+    send_low_stock_digest,
+    window_seconds=settings.LOW_STOCK_DIGEST_WINDOW_SECONDS,
+    realert_seconds=settings.LOW_STOCK_REALERT_SECONDS,
+)
\ No newline at end of file
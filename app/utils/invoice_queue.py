@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from app.utils.invoice import generate_invoice_pdf
+from app.config import settings
+
+def invoice_path(order_id: str) -> str:
+    return os.path.join(settings.INVOICE_DIR, f"invoice_{order_id}.pdf")
+
+def _render(order_data):
+    started = time.perf_counter()
+    # Render aside and move into place so a half-written file is never served.
+    rendered_path = generate_invoice_pdf(order_data, output_dir=os.path.join(settings.INVOICE_DIR, ".rendering"))
+    pdf_path = invoice_path(order_data.order_id)
+    os.replace(rendered_path, pdf_path)
+    return pdf_path, time.perf_counter() - started
+
+class InvoiceRenderQueue:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.rendered = 0
+        self.failed = 0
+        self.total_render_seconds = 0.0
+        self.max_render_seconds = 0.0
+        self.last_render_seconds = 0.0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the API process holds threads and open MongoDB sockets.
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def submit(self, order_data) -> Future:
+        result = Future()
+        with self._lock:
+            self.pending += 1
+        render = self._get_executor().submit(_render, order_data)
+        render.add_done_callback(lambda done: self._on_rendered(done, result))
+        return result
+
+    def _on_rendered(self, render: Future, result: Future):
+        with self._lock:
+            self.pending -= 1
+            error = CancelledError() if render.cancelled() else render.exception()
+            if error is None:
+                pdf_path, seconds = render.result()
+                self.rendered += 1
+                self.total_render_seconds += seconds
+                self.max_render_seconds = max(self.max_render_seconds, seconds)
+                self.last_render_seconds = seconds
+            else:
+                self.failed += 1
+        if error is None:
+            result.set_result(pdf_path)
+        else:
+            result.set_exception(error)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "queue_depth": self.pending,
+            "rendered": self.rendered,
+            "failed": self.failed,
+            "avg_render_ms": round(self.total_render_seconds / self.rendered * 1000, 1) if self.rendered else 0.0,
+            "max_render_ms": round(self.max_render_seconds * 1000, 1),
+            "last_render_ms": round(self.last_render_seconds * 1000, 1),
+        }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+invoice_queue = InvoiceRenderQueue(settings.INVOICE_RENDER_WORKERS)
@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+
+logger = logging.getLogger(__name__)
+
+# Collects low-stock events and hands `send_digest(seller_email, {product: stock})`
+# one call per seller per window. A product is not re-alerted within
+# `realert_seconds` of its last delivered digest unless it has sold out since.
+class LowStockAggregator:
+    def __init__(self, send_digest, window_seconds: float, realert_seconds: float, timer=time.monotonic):
+        self._send_digest = send_digest
+        self.window_seconds = window_seconds
+        self.realert_seconds = realert_seconds
+        self._timer = timer
+        self._pending = {}
+        self._last_alerted = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.events = 0
+        self.suppressed = 0
+        self.digests_sent = 0
+        self.failed = 0
+
+    def record(self, seller_email: str, product_name: str, stock: int):
+        with self._lock:
+            self.events += 1
+            alerted_at = self._last_alerted.get((seller_email, product_name))
+            if alerted_at is not None and stock > 0 and self._timer() - alerted_at < self.realert_seconds:
+                self.suppressed += 1
+                return
+            self._pending.setdefault(seller_email, {})[product_name] = stock
+            self._ensure_started()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            now = self._timer()
+            self._last_alerted = {
+                key: alerted_at for key, alerted_at in self._last_alerted.items()
+                if now - alerted_at < self.realert_seconds
+            }
+
+        for seller_email, products in pending.items():
+            try:
+                sent = self._send_digest(seller_email, products)
+            except Exception as e:
+                self._on_sent(seller_email, products, e)
+                continue
+            # The digest may be queued for delivery; only count it once it has gone out.
+            if isinstance(sent, Future):
+                sent.add_done_callback(
+                    lambda done, seller_email=seller_email, products=products:
+                        self._on_sent(seller_email, products, CancelledError() if done.cancelled() else done.exception())
+                )
+            else:
+                self._on_sent(seller_email, products, None)
+
+    def _on_sent(self, seller_email: str, products: dict, error):
+        with self._lock:
+            if error is not None:
+                self.failed += 1
+            else:
+                self.digests_sent += 1
+                now = self._timer()
+                for product_name in products:
+                    self._last_alerted[(seller_email, product_name)] = now
+        if error is not None:
+            logger.error(f"Failed to send low stock digest to {seller_email}: {error}")
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.window_seconds)
+        self.flush()
+
+    def stats(self):
+        return {
+            "pending_sellers": len(self._pending),
+            "events": self.events,
+            "suppressed": self.suppressed,
+            "digests_sent": self.digests_sent,
+            "failed": self.failed,
+        }
+
+    def _ensure_started(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="low-stock-digest", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.window_seconds):
+            self.flush()
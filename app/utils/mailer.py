@@ -0,0 +1,172 @@
+import logging
+import queue
+import smtplib
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+# Queue-backed SMTP delivery. Each worker thread keeps one authenticated
+# connection open between batches and drops it after `idle_timeout` seconds
+# without traffic, so bursts of mail reuse a handful of sessions instead of
+# paying connect + STARTTLS + AUTH per message.
+class Mailer:
+    def __init__(self, host: str, port: int, username: str = None, password: str = None, use_tls: bool = True,
+                 pool_size: int = 2, batch_size: int = 20, max_retries: int = 3, backoff_seconds: float = 1.0,
+                 idle_timeout: float = 60.0, timeout: float = 30.0, smtp_factory=smtplib.SMTP):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._smtp_factory = smtp_factory
+        self._queue = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.connections_opened = 0
+
+    def send(self, message) -> Future:
+        delivered = Future()
+        self._ensure_started()
+        self._queue.put((message, delivered))
+        return delivered
+
+    def join(self):
+        self._queue.join()
+
+    def close(self, timeout: float = 10.0):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for _ in workers:
+            self._queue.put(_STOP)
+        for worker in workers:
+            worker.join(timeout)
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "workers": len(self._workers),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "connections_opened": self.connections_opened,
+        }
+
+    def _ensure_started(self):
+        with self._lock:
+            while len(self._workers) < self.pool_size:
+                worker = threading.Thread(target=self._run, name=f"mailer-{len(self._workers)}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _connect(self):
+        connection = self._smtp_factory(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            connection.starttls()
+        if self.username:
+            connection.login(self.username, self.password)
+        with self._lock:
+            self.connections_opened += 1
+        return connection
+
+    def _is_alive(self, connection) -> bool:
+        try:
+            return connection.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _disconnect(self, connection):
+        if connection is None:
+            return
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+    def _next_batch(self):
+        try:
+            first = self._queue.get(timeout=self.idle_timeout)
+        except queue.Empty:
+            return None
+        batch = [first]
+        while batch[-1] is not _STOP and len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        connection = None
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                self._disconnect(connection)
+                connection = None
+                continue
+
+            messages = [item for item in batch if item is not _STOP]
+            try:
+                if messages:
+                    connection = self._deliver(connection, messages)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+            if len(messages) < len(batch):
+                self._disconnect(connection)
+                return
+
+    def _deliver(self, connection, messages):
+        attempt = 0
+        while messages:
+            try:
+                if connection is None or not self._is_alive(connection):
+                    self._disconnect(connection)
+                    connection = self._connect()
+                while messages:
+                    self._send_one(connection, messages[0])
+                    messages.pop(0)
+            except (smtplib.SMTPException, OSError) as e:
+                # Connection-level failure: reconnect and resend whatever is left.
+                self._disconnect(connection)
+                connection = None
+                attempt += 1
+                if attempt > self.max_retries:
+                    logger.error(f"Giving up on {len(messages)} email(s) after {self.max_retries} retries: {e}")
+                    with self._lock:
+                        self.failed += len(messages)
+                    for _, delivered in messages:
+                        delivered.set_exception(e)
+                    return None
+                with self._lock:
+                    self.retries += 1
+                time.sleep(self.backoff_seconds * 2 ** (attempt - 1))
+        return connection
+
+    def _send_one(self, connection, item):
+        message, delivered = item
+        try:
+            connection.send_message(message)
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+            # The server rejected this message; retrying it would not help.
+            logger.error(f"Email to {message['To']} rejected: {e}")
+            with self._lock:
+                self.failed += 1
+            delivered.set_exception(e)
+            return
+        with self._lock:
+            self.sent += 1
+        delivered.set_result(True)
@@ -0,0 +1,88 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from app.models.users import pwd_context
+from app.config import settings
+
+class PasswordPoolBusy(Exception):
+    pass
+
+def _hash(password: str):
+    started = time.time()
+    return pwd_context.hash(password), started
+
+def _verify(password: str, hashed_password: str):
+    started = time.time()
+    return pwd_context.verify(password, hashed_password), started
+
+# bcrypt is deliberately slow, so hashing runs in worker processes where it
+# can use every core without holding the API's GIL. `max_pending` caps how
+# many calls may wait on the pool; beyond that callers are turned away
+# instead of queueing behind a login spike.
+class PasswordPool:
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_queue_seconds = 0.0
+        self.max_queue_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._submit(_verify, password, hashed_password)
+
+    async def _submit(self, func, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordPoolBusy()
+            self.pending += 1
+        submitted = time.time()
+        try:
+            result, started = await asyncio.wrap_future(self._get_executor().submit(func, *args))
+        finally:
+            with self._lock:
+                self.pending -= 1
+        finished = time.time()
+        with self._lock:
+            self.completed += 1
+            queue_seconds = max(started - submitted, 0.0)
+            self.total_queue_seconds += queue_seconds
+            self.max_queue_seconds = max(self.max_queue_seconds, queue_seconds)
+            self.total_run_seconds += finished - started
+        return result
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_queue_ms": round(self.total_queue_seconds / self.completed * 1000, 1) if self.completed else 0.0,
+            "max_queue_ms": round(self.max_queue_seconds * 1000, 1),
+            "avg_hash_ms": round(self.total_run_seconds / self.completed * 1000, 1) if self.completed else 0.0,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+password_pool = PasswordPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+import stripe
+
+logger = logging.getLogger(__name__)
+
+# Looks up the outcome of a checkout session with a payment provider.
+# checkout_status returns "succeeded", "failed", or None while the buyer
+# can still pay.
+class PaymentProvider(ABC):
+    @abstractmethod
+    async def checkout_status(self, session_id: str):
+        ...
+
+class StripeProvider(PaymentProvider):
+    async def checkout_status(self, session_id: str):
+        # The Stripe SDK is synchronous; keep it off the event loop.
+        session = await asyncio.to_thread(stripe.checkout.Session.retrieve, session_id)
+        if session.payment_status == "paid":
+            return "succeeded"
+        if session.status == "expired":
+            return "failed"
+        return None
+
+class FakeProvider(PaymentProvider):
+    def __init__(self, statuses: dict, delay: float = 0.0, errors: set = None):
+        self.statuses = statuses
+        self.delay = delay
+        self.errors = errors or set()
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def checkout_status(self, session_id: str):
+        self.calls.append((session_id, time.monotonic()))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if session_id in self.errors:
+                raise RuntimeError(f"provider error for {session_id}")
+            return self.statuses.get(session_id)
+        finally:
+            self.in_flight -= 1
+
+# Spaces calls evenly so at most `rate` start per second.
+class RateLimiter:
+    def __init__(self, rate: float, timer=time.monotonic):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._timer = timer
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = self._timer()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+async def fetch_checkout_outcomes(provider: PaymentProvider, session_ids, concurrency: int, rate: float):
+    limiter = RateLimiter(rate)
+    semaphore = asyncio.Semaphore(concurrency)
+    outcomes, errors = {}, 0
+
+    async def lookup(session_id):
+        nonlocal errors
+        async with semaphore:
+            await limiter.acquire()
+            try:
+                status = await provider.checkout_status(session_id)
+            except Exception as e:
+                # Left pending; the next run will ask again.
+                errors += 1
+                logger.warning(f"Could not fetch checkout session {session_id}: {e}")
+                return
+        if status is not None:
+            outcomes[session_id] = status
+
+    await asyncio.gather(*(lookup(session_id) for session_id in session_ids))
+    return outcomes, errors
@@ -0,0 +1,7 @@
+from app.utils.cache import TTLCache
+from app.config import settings
+
+# Per-worker cache of the User documents behind authenticated requests.
+# Writes on this worker invalidate immediately; other workers pick up the
+# change once PRINCIPAL_CACHE_TTL_SECONDS has passed.
+principal_cache = TTLCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
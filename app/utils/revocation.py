@@ -0,0 +1,122 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from mongoengine import NotUniqueError
+from app.models.tokens import RevokedToken
+from app.utils.bloom import BloomFilter
+from app.config import settings
+
+class MemoryRevocationStore:
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, jti: str, expires_at: datetime):
+        with self._lock:
+            self._entries[jti] = expires_at
+            self._purge_expired()
+
+    def is_revoked(self, jti: str) -> bool:
+        expires_at = self._entries.get(jti)
+        return expires_at is not None and expires_at > datetime.now(timezone.utc)
+
+    def _purge_expired(self):
+        now = datetime.now(timezone.utc)
+        for jti in [jti for jti, expires_at in self._entries.items() if expires_at <= now]:
+            del self._entries[jti]
+
+    def stats(self):
+        return {"backend": "memory", "entries": len(self._entries)}
+
+class MongoRevocationStore:
+    def revoke(self, jti: str, expires_at: datetime):
+        try:
+            RevokedToken(jti=jti, expires_at=expires_at).save()
+        except NotUniqueError:
+            pass
+
+    def is_revoked(self, jti: str) -> bool:
+        return RevokedToken.objects(jti=jti, expires_at__gt=datetime.now(timezone.utc)).only("id").first() is not None
+
+    def revoked_since(self, since: datetime):
+        return RevokedToken.objects(revoked_at__gte=since).scalar("jti")
+
+    def active(self):
+        return RevokedToken.objects(expires_at__gt=datetime.now(timezone.utc)).scalar("jti")
+
+    def stats(self):
+        return {"backend": "mongo"}
+
+# Answers "definitely not revoked" from a local Bloom filter. The filter is
+# topped up from the shared store every `sync_seconds`, so a logout on another
+# worker takes effect here within that interval. Positive hits are confirmed
+# against the store, which also handles expiry and false positives.
+class BloomFrontedStore:
+    def __init__(self, store: MongoRevocationStore, capacity: int, sync_seconds: float, rebuild_seconds: float):
+        self._store = store
+        self._capacity = capacity
+        self._sync_seconds = sync_seconds
+        self._rebuild_seconds = rebuild_seconds
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._synced_at = 0.0
+        self._synced_since = None
+        self._rebuilt_at = 0.0
+        self.bloom_negatives = 0
+        self.store_lookups = 0
+
+    def revoke(self, jti: str, expires_at: datetime):
+        self._store.revoke(jti, expires_at)
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+
+    def is_revoked(self, jti: str) -> bool:
+        self._refresh()
+        if jti not in self._bloom:
+            self.bloom_negatives += 1
+            return False
+        self.store_lookups += 1
+        return self._store.is_revoked(jti)
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._bloom is not None and now - self._synced_at < self._sync_seconds:
+            return
+        with self._lock:
+            if self._bloom is not None and now - self._synced_at < self._sync_seconds:
+                return
+            # Overlap the window slightly so clock skew between workers cannot drop entries.
+            sync_started = datetime.utcnow() - timedelta(seconds=5)
+            if (self._bloom is None or self._bloom.count > self._capacity
+                    or now - self._rebuilt_at >= self._rebuild_seconds):
+                bloom = BloomFilter(self._capacity)
+                for jti in self._store.active():
+                    bloom.add(jti)
+                self._bloom = bloom
+                self._rebuilt_at = now
+            else:
+                for jti in self._store.revoked_since(self._synced_since):
+                    self._bloom.add(jti)
+            self._synced_since = sync_started
+            self._synced_at = now
+
+    def stats(self):
+        return {
+            "backend": "mongo+bloom",
+            "bloom_entries": self._bloom.count if self._bloom is not None else 0,
+            "bloom_negatives": self.bloom_negatives,
+            "store_lookups": self.store_lookups,
+        }
+
+def build_revocation_store():
+    if settings.REVOCATION_BACKEND == "memory":
+        return MemoryRevocationStore()
+    return BloomFrontedStore(
+        MongoRevocationStore(),
+        capacity=settings.REVOCATION_BLOOM_CAPACITY,
+        sync_seconds=settings.REVOCATION_SYNC_SECONDS,
+        rebuild_seconds=settings.REVOCATION_REBUILD_SECONDS,
+    )
+
+revocation_store = build_revocation_store()
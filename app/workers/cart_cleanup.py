@@ -0,0 +1,45 @@
+# Deletes carts nobody is using: empty carts once they have sat idle for
+# EMPTY_CART_RETENTION_HOURS, and any cart untouched for
+# STALE_CART_RETENTION_DAYS. Meant to run from cron.
+#
+#   python -m app.workers.cart_cleanup --dry-run
+import argparse
+import logging
+from datetime import datetime, timedelta
+from app.config import settings
+from app.database import connect_db, disconnect_db
+from app.models.carts import Cart
+
+logger = logging.getLogger("cart_cleanup")
+
+def reclaimable_carts(now: datetime, empty_hours: float, stale_days: float):
+    return {"$or": [
+        {"updated_at": {"$lt": now - timedelta(hours=empty_hours)}, "items": {"$size": 0}},
+        {"updated_at": {"$lt": now - timedelta(days=stale_days)}},
+    ]}
+
+def cleanup_carts(empty_hours: float, stale_days: float, dry_run: bool = False) -> int:
+    query = reclaimable_carts(datetime.now(), empty_hours, stale_days)
+    collection = Cart._get_collection()
+    if dry_run:
+        return collection.count_documents(query)
+    return collection.delete_many(query).deleted_count
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete empty and abandoned carts.")
+    parser.add_argument("--empty-hours", type=float, default=settings.EMPTY_CART_RETENTION_HOURS)
+    parser.add_argument("--stale-days", type=float, default=settings.STALE_CART_RETENTION_DAYS)
+    parser.add_argument("--dry-run", action="store_true", help="only count the carts that would be deleted")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s - %(message)s")
+    connect_db()
+    try:
+        reclaimed = cleanup_carts(args.empty_hours, args.stale_days, args.dry_run)
+    finally:
+        disconnect_db()
+    action = "would delete" if args.dry_run else "deleted"
+    logger.info(f"{action} {reclaimed} cart(s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# One-off migration that merges duplicate carts so the unique index on
+# Cart.buyer can be built. Run it with the API stopped, before starting the
+# release that adds the index (see README, "Unique carts").
+#
+# Each buyer keeps their most recently updated cart. Lines from the other
+# carts are merged into it; when two carts hold the same product, the
+# quantity from the more recently updated cart wins. Safe to re-run.
+#
+#   python -m app.workers.cart_dedupe --dry-run
+import argparse
+import logging
+from datetime import datetime
+from pymongo import DeleteOne, UpdateOne
+from mongoengine.connection import get_db
+from app.database import connect_db, disconnect_db
+from app.models.carts import Cart
+
+logger = logging.getLogger("cart_dedupe")
+
+DUPLICATE_BUYERS = [
+    {"$group": {"_id": "$buyer", "count": {"$sum": 1}}},
+    {"$match": {"count": {"$gt": 1}}},
+    {"$sort": {"_id": 1}},
+]
+
+# Cart._get_collection() would try to build the unique index first and fail.
+def _carts():
+    return get_db()[Cart._get_collection_name()]
+
+def _merge(carts):
+    carts = sorted(carts, key=lambda cart: cart.get("updated_at") or datetime.min)
+    keeper = carts[-1]
+    quantities = {}
+    for cart in carts:
+        for item in cart.get("items", []):
+            quantities[item["product"]] = item["quantity"]
+    update = UpdateOne(
+        {"_id": keeper["_id"]},
+        {
+            "$set": {
+                "items": [{"product": product_id, "quantity": quantity} for product_id, quantity in quantities.items()],
+                "created_at": min(cart.get("created_at") or datetime.max for cart in carts),
+            },
+            "$inc": {"version": 1},
+        },
+    )
+    return [update] + [DeleteOne({"_id": cart["_id"]}) for cart in carts[:-1]]
+
+def dedupe(batch_size: int, dry_run: bool = False) -> int:
+    collection = _carts()
+    buyers = [row["_id"] for row in collection.aggregate(DUPLICATE_BUYERS, allowDiskUse=True)]
+    if dry_run:
+        return len(buyers)
+
+    for start in range(0, len(buyers), batch_size):
+        batch = buyers[start:start + batch_size]
+        carts = {}
+        for cart in collection.find({"buyer": {"$in": batch}}):
+            carts.setdefault(cart["buyer"], []).append(cart)
+        operations = [operation for buyer_carts in carts.values() for operation in _merge(buyer_carts)]
+        collection.bulk_write(operations, ordered=True)
+        logger.info(f"merged carts for {start + len(batch)} of {len(buyers)} buyer(s)")
+    return len(buyers)
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge duplicate carts before the unique buyer index is built.")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--dry-run", action="store_true", help="only count the buyers with more than one cart")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s - %(message)s")
+    connect_db()
+    try:
+        merged = dedupe(args.batch_size, args.dry_run)
+    finally:
+        disconnect_db()
+    action = "would merge" if args.dry_run else "merged"
+    logger.info(f"{action} carts for {merged} buyer(s)")
+
+if __name__ == "__main__":
+    main()
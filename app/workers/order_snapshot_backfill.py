@@ -0,0 +1,79 @@
+# One-off migration that adds line snapshots, buyer_name and coupon_code to
+# orders placed before checkout started recording them. Prices come from
+# the product as it is today, which is the best record left for those orders.
+# Safe to re-run: only orders with a line lacking product_name are touched.
+#
+#   python -m app.workers.order_snapshot_backfill --batch-size 200
+import argparse
+import logging
+from pymongo import UpdateOne
+from app.database import connect_db, disconnect_db
+from app.models.order import Order
+from app.models.products import Product
+from app.crud.order_crud import snapshot_order_line
+from app.utils.dereference import resolve_references
+
+logger = logging.getLogger("order_snapshot_backfill")
+
+MISSING_SNAPSHOT = {"items": {"$elemMatch": {"product_name": {"$exists": False}}}}
+
+def _backfill_update(order: Order):
+    lines = []
+    for item in order.items:
+        if item.product_name is not None:
+            lines.append(item)
+        elif isinstance(item._data.get("product"), Product):
+            lines.append(snapshot_order_line(item.product, item.quantity))
+        else:
+            return None
+    return UpdateOne(
+        {"_id": order.id},
+        {"$set": {
+            "items": [line.to_mongo().to_dict() for line in lines],
+            "buyer_name": order.buyer.full_name if order.buyer else None,
+            "coupon_code": order.coupon.code if order.coupon else None,
+        }},
+    )
+
+def backfill(batch_size: int) -> int:
+    collection = Order._get_collection()
+    updated = skipped = 0
+    last_id = None
+    while True:
+        query = dict(MISSING_SNAPSHOT)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        orders = list(Order.objects(__raw__=query).order_by("id").limit(batch_size))
+        if not orders:
+            break
+        last_id = orders[-1].id
+
+        resolve_references(orders, "buyer", "coupon")
+        resolve_references([item for order in orders for item in order.items], "product", "product.seller", "product.offer", cached=False)
+        updates = []
+        for order in orders:
+            update = _backfill_update(order)
+            if update is None:
+                # A referenced product was deleted; there is nothing left to snapshot.
+                skipped += 1
+            else:
+                updates.append(update)
+        if updates:
+            updated += collection.bulk_write(updates, ordered=False).modified_count
+        logger.info(f"backfilled {updated} order(s), skipped {skipped}")
+    return updated
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot order lines for orders placed before snapshots existed.")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s - %(message)s")
+    connect_db()
+    try:
+        backfill(args.batch_size)
+    finally:
+        disconnect_db()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# Drains the outbox collection written at checkout.
+#
+#   python -m app.workers.outbox_worker --concurrency 8
+import argparse
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.config import settings
+from app.database import connect_db, disconnect_db
+from app.crud.outbox_crud import claim_next_message, mark_done, mark_failed
+from app.crud.order_crud import build_order_response, resolve_order_references
+from app.utils.dereference import resolve_references
+from app.models.order import Order
+from app.models.products import Product
+from app.utils.invoice import send_email_with_invoice, send_sms_notification, mailer, low_stock_alerts
+from app.utils.invoice_queue import invoice_queue
+
+logger = logging.getLogger("outbox_worker")
+
+def _load_order(payload):
+    order = Order.objects.get(id=payload["order_id"])
+    resolve_order_references([order])
+    return order
+
+def send_order_invoice_email(payload):
+    order = _load_order(payload)
+    order_response = build_order_response(order, buyer_name=order.buyer.full_name)
+    pdf_path = invoice_queue.submit(order_response).result(timeout=settings.INVOICE_RENDER_TIMEOUT_SECONDS)
+    delivered = send_email_with_invoice(
+        to_email=order.buyer.email,
+        subject="Your Order Invoice",
+        order_data=order_response,
+        attachment_path=pdf_path
+    )
+    delivered.result(timeout=settings.OUTBOX_SEND_TIMEOUT_SECONDS)
+
+def send_order_sms(payload):
+    order = _load_order(payload)
+    if not order.buyer.phone_no:
+        return
+    send_sms_notification(
+        phone_number=order.buyer.phone_no,
+        message_body=f"Your order with ID {order.id} has been placed successfully."
+    )
+
+# Stock is read when the message is handled, so a restock in between
+# suppresses the alert. The aggregator batches alerts into one digest per
+# seller per window.
+def check_low_stock(payload):
+    order = Order.objects.only("items").get(id=payload["order_id"])
+    product_ids = [item._data["product"].id for item in order.items]
+    low_stock = Product.objects(id__in=product_ids, stock__lt=settings.LOW_STOCK_THRESHOLD).only("name", "stock", "seller")
+    for product in resolve_references(list(low_stock), "seller"):
+        low_stock_alerts.record(product.seller.email, product.name, product.stock)
+
+HANDLERS = {
+    "order_invoice_email": send_order_invoice_email,
+    "order_sms": send_order_sms,
+    "low_stock_check": check_low_stock,
+}
+
+def process(message):
+    try:
+        HANDLERS[message.kind](message.payload)
+    except Exception as e:
+        status = mark_failed(
+            message,
+            error=f"{type(e).__name__}: {e}",
+            max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+            backoff_seconds=settings.OUTBOX_RETRY_BACKOFF_SECONDS,
+            max_backoff_seconds=settings.OUTBOX_MAX_BACKOFF_SECONDS,
+        )
+        logger.warning(f"{message.kind} {message.id} attempt {message.attempts} failed ({status}): {e}")
+    else:
+        if mark_done(message):
+            logger.info(f"{message.kind} {message.id} delivered")
+        else:
+            logger.warning(f"{message.kind} {message.id} delivered after its lease lapsed; another worker owns it now")
+
+def run(concurrency: int, poll_interval: float, once: bool = False, report_interval: float = 60.0):
+    slots = threading.BoundedSemaphore(concurrency)
+    last_report = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="outbox") as executor:
+        while True:
+            if time.monotonic() - last_report >= report_interval:
+                logger.info(f"invoice render stats: {invoice_queue.stats()}, mailer stats: {mailer.stats()}, low stock alerts: {low_stock_alerts.stats()}")
+                last_report = time.monotonic()
+
+            slots.acquire()
+            message = claim_next_message(settings.OUTBOX_LEASE_SECONDS)
+            if message is None:
+                slots.release()
+                if once:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            future = executor.submit(process, message)
+            future.add_done_callback(lambda _: slots.release())
+
+def main():
+    parser = argparse.ArgumentParser(description="Deliver queued post-order side effects.")
+    parser.add_argument("--concurrency", type=int, default=settings.OUTBOX_CONCURRENCY)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--once", action="store_true", help="exit once the outbox has no due messages")
+    args = parser.parse_args()
+    if settings.INVOICE_RENDER_TIMEOUT_SECONDS + settings.OUTBOX_SEND_TIMEOUT_SECONDS >= settings.OUTBOX_LEASE_SECONDS:
+        parser.error("INVOICE_RENDER_TIMEOUT_SECONDS + OUTBOX_SEND_TIMEOUT_SECONDS must be below OUTBOX_LEASE_SECONDS")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s - %(message)s")
+    connect_db()
+    try:
+        run(args.concurrency, args.poll_interval, args.once)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        invoice_queue.shutdown()
+        low_stock_alerts.close()
+        mailer.close()
+        disconnect_db()
+
+if __name__ == "__main__":
+    main()
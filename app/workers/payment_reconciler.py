@@ -0,0 +1,80 @@
+# Settles online orders stuck in "pending" because their webhook was lost.
+# Pending orders are paged in _id order, their checkout sessions are looked
+# up with bounded concurrency and a rate limit, and each page is applied
+# through the same pending-guarded path as the webhook worker.
+#
+#   python -m app.workers.payment_reconciler --concurrency 8 --rate 20
+#   python -m app.workers.payment_reconciler --dry-run
+import argparse
+import asyncio
+import functools
+import logging
+from datetime import datetime, timedelta
+from app.config import settings
+from app.database import connect_db, disconnect_db
+from app.crud.payment_crud import apply_payment_outcomes
+from app.models.order import Order
+from app.schemas.orderschema import PaymentStatus
+from app.utils.concurrency import run_blocking
+from app.utils.payment_providers import StripeProvider, fetch_checkout_outcomes
+
+logger = logging.getLogger("payment_reconciler")
+
+def pending_checkout_page(after, older_than: datetime, limit: int):
+    query = {
+        "payment_status": PaymentStatus.PENDING.value,
+        "charge.stripe_checkout_id": {"$ne": None},
+        "order_at": {"$lt": older_than},
+    }
+    if after is not None:
+        query["_id"] = {"$gt": after}
+    cursor = Order._get_collection().find(query, {"_id": 1, "charge.stripe_checkout_id": 1}).sort("_id", 1).limit(limit)
+    return [(document["_id"], document["charge"]["stripe_checkout_id"]) for document in cursor]
+
+# Pages orders with `load_page(after=..., limit=...)`, which returns
+# (order_id, checkout_session_id) pairs in _id order, and hands whatever
+# the provider reports for each page to `apply`. Sessions the provider
+# cannot settle yet are left pending.
+async def reconcile(provider, load_page, page_size: int, concurrency: int, rate: float, dry_run: bool = False, apply=apply_payment_outcomes):
+    totals = {"checked": 0, "succeeded": 0, "failed": 0, "unchanged": 0, "errors": 0}
+    after = None
+    while True:
+        page = await run_blocking(load_page, after=after, limit=page_size)
+        if not page:
+            break
+        after = page[-1][0]
+
+        session_ids = [session_id for _, session_id in page]
+        outcomes, errors = await fetch_checkout_outcomes(provider, session_ids, concurrency, rate)
+        totals["checked"] += len(page)
+        totals["errors"] += errors
+        if dry_run:
+            for status in outcomes.values():
+                totals[status] += 1
+        else:
+            counts = await run_blocking(apply, outcomes)
+            for status, count in counts.items():
+                totals[status] += count
+        logger.info(f"reconciled {totals['checked']} pending order(s) so far: {totals}")
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile pending online orders with the payment provider.")
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=20.0, help="maximum provider requests per second")
+    parser.add_argument("--min-age-minutes", type=float, default=10.0, help="skip orders younger than this; their webhook may still arrive")
+    parser.add_argument("--dry-run", action="store_true", help="report outcomes without updating orders")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s - %(message)s")
+    connect_db()
+    try:
+        load_page = functools.partial(pending_checkout_page, older_than=datetime.now() - timedelta(minutes=args.min_age_minutes))
+        totals = asyncio.run(reconcile(StripeProvider(), load_page, args.page_size, args.concurrency, args.rate, args.dry_run))
+    finally:
+        disconnect_db()
+    logger.info(f"done: {totals}")
+
+if __name__ == "__main__":
+    main()
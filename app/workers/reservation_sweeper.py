@@ -0,0 +1,73 @@
+# Settles online orders whose stock hold has run out. Each one is checked
+# with the payment provider before anything changes: a payment that landed
+# late still succeeds, an expired session fails the order and returns its
+# stock, and a session the provider cannot answer for stays pending until
+# the next pass. Holds with no pending order behind them are settled last.
+#
+#   python -m app.workers.reservation_sweeper --interval 60
+import argparse
+import asyncio
+import functools
+import logging
+from datetime import datetime, timedelta
+from app.config import settings
+from app.database import connect_db, disconnect_db
+from app.crud.payment_crud import settle_orphaned_holds
+from app.models.order import Order
+from app.schemas.orderschema import PaymentStatus
+from app.utils.concurrency import run_blocking
+from app.utils.payment_providers import StripeProvider
+from app.workers.payment_reconciler import reconcile
+
+logger = logging.getLogger("reservation_sweeper")
+
+def expired_checkout_page(after, cutoff: datetime, limit: int):
+    query = {
+        "payment_status": PaymentStatus.PENDING.value,
+        "reservation_expires_at": {"$lt": cutoff},
+        "charge.stripe_checkout_id": {"$ne": None},
+    }
+    if after is not None:
+        query["_id"] = {"$gt": after}
+    cursor = Order._get_collection().find(query, {"_id": 1, "charge.stripe_checkout_id": 1}).sort("_id", 1).limit(limit)
+    return [(document["_id"], document["charge"]["stripe_checkout_id"]) for document in cursor]
+
+# `grace_seconds` past expiry gives a webhook for a last-second payment time
+# to arrive before the provider is asked.
+async def sweep(provider, grace_seconds: float, batch_size: int, concurrency: int, rate: float):
+    cutoff = datetime.now() - timedelta(seconds=grace_seconds)
+    load_page = functools.partial(expired_checkout_page, cutoff=cutoff)
+    totals = await reconcile(provider, load_page, batch_size, concurrency, rate)
+    totals.update(await run_blocking(settle_orphaned_holds, cutoff))
+    return totals
+
+async def run(provider, grace_seconds: float, batch_size: int, concurrency: int, rate: float, interval: float, once: bool = False):
+    while True:
+        totals = await sweep(provider, grace_seconds, batch_size, concurrency, rate)
+        if totals["checked"] or totals["holds_released"] or totals["holds_committed"]:
+            logger.info(f"swept expired reservations: {totals}")
+        if once:
+            break
+        await asyncio.sleep(interval)
+
+def main():
+    parser = argparse.ArgumentParser(description="Settle online orders whose stock reservation has expired.")
+    parser.add_argument("--grace-seconds", type=float, default=settings.RESERVATION_SWEEP_GRACE_SECONDS)
+    parser.add_argument("--batch-size", type=int, default=settings.RESERVATION_SWEEP_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=20.0, help="maximum provider requests per second")
+    parser.add_argument("--interval", type=float, default=60.0)
+    parser.add_argument("--once", action="store_true", help="sweep once, then exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s - %(message)s")
+    connect_db()
+    try:
+        asyncio.run(run(StripeProvider(), args.grace_seconds, args.batch_size, args.concurrency, args.rate, args.interval, args.once))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        disconnect_db()
+
+if __name__ == "__main__":
+    main()
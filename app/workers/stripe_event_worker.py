@@ -0,0 +1,52 @@
+# Applies Stripe webhook events queued by /api/v1/order/stripe-webhook.
+# Events are taken in arrival order and folded into one outcome per checkout
+# session. Orders only move out of "pending" once, so a redelivered event or
+# an overlapping reconciler run never notifies twice.
+#
+#   python -m app.workers.stripe_event_worker --batch-size 200
+import argparse
+import logging
+import time
+from app.config import settings
+from app.database import connect_db, disconnect_db
+from app.crud.payment_crud import pending_stripe_events, fold_events, apply_payment_outcomes, mark_events_processed
+
+logger = logging.getLogger("stripe_event_worker")
+
+def process_batch(batch_size: int) -> int:
+    events = pending_stripe_events(batch_size)
+    if not events:
+        return 0
+
+    outcomes, applied, ignored = fold_events(events)
+    counts = apply_payment_outcomes(outcomes)
+    mark_events_processed(applied, ignored)
+    logger.info(f"processed {len(events)} event(s): {counts['succeeded']} paid, {counts['failed']} failed, {counts['unchanged']} already settled, {len(ignored)} ignored")
+    return len(events)
+
+def run(batch_size: int, poll_interval: float, once: bool = False):
+    while True:
+        processed = process_batch(batch_size)
+        if processed < batch_size:
+            if once:
+                break
+            time.sleep(poll_interval)
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply queued Stripe webhook events to orders.")
+    parser.add_argument("--batch-size", type=int, default=settings.STRIPE_EVENT_BATCH_SIZE)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--once", action="store_true", help="exit once no events are pending")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s - %(message)s")
+    connect_db()
+    try:
+        run(args.batch_size, args.poll_interval, args.once)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        disconnect_db()
+
+if __name__ == "__main__":
+    main()
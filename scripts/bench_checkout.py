@@ -0,0 +1,92 @@
+# Compares checkout throughput with and without multi-document transactions.
+# Needs a replica set (see docker-compose.replset.yml) and writes to a
+# scratch database that is dropped afterwards.
+#
+#   MONGO_URI="mongodb://localhost:27017/?replicaSet=rs0&directConnection=true" \
+#       python -m scripts.bench_checkout --orders 500 --concurrency 8 --lines 5
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from mongoengine import connect, disconnect
+from mongoengine.connection import get_db
+
+from app.config import settings
+from app.crud.order_crud import create_order_logic
+from app.models.carts import Cart, CartItem
+from app.models.products import Product, Category, Brand
+from app.models.users import Buyer, Seller, Address
+from app.schemas.orderschema import OrderCreate, PaymentMethod
+
+BENCH_DATABASE = "bench_checkout"
+
+def seed(buyers: int, lines: int):
+    seller = Seller(username="bench-seller", email="seller@bench.test", full_name="Bench Seller", role="seller",
+                    hashed_password="x", store_name="Bench Store", store_address="1 Bench Road").save()
+    category = Category(name="bench").save()
+    brand = Brand(name="bench").save()
+    products = [
+        Product(name=f"bench-{i}", price=Decimal("10.00"), stock=10_000_000, category=category, brand=brand, seller=seller).save()
+        for i in range(lines)
+    ]
+    address = Address(address_line1="1 Bench Road", city="Pune", state="MH", postal_code="411001", country="IN", is_primary=True)
+    accounts = [
+        Buyer(username=f"bench-buyer-{i}", email=f"buyer{i}@bench.test", full_name=f"Buyer {i}", role="buyer",
+              hashed_password="x", addresses=[address]).save()
+        for i in range(buyers)
+    ]
+    return products, accounts
+
+def checkout(buyer, products, order_data):
+    Cart.objects(buyer=buyer).update_one(
+        set__items=[CartItem(product=product, quantity=1) for product in products], upsert=True
+    )
+    started = time.perf_counter()
+    create_order_logic(order_data, buyer)
+    return (time.perf_counter() - started) * 1000
+
+def run_mode(transactional: bool, products, buyers, orders: int):
+    settings.CHECKOUT_TRANSACTIONS = transactional
+    order_data = OrderCreate(payment_method=PaymentMethod.COD)
+    # One worker per buyer so carts are never shared between threads.
+    per_buyer = orders // len(buyers)
+
+    def worker(buyer):
+        return [checkout(buyer, products, order_data) for _ in range(per_buyer)]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(buyers)) as executor:
+        samples = [sample for result in executor.map(worker, buyers) for sample in result]
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(samples)
+    return {
+        "mode": "transaction" if transactional else "compensating",
+        "orders": len(samples),
+        "throughput_ops": round(len(samples) / elapsed, 1),
+        "p50_ms": round(statistics.median(samples), 1),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--lines", type=int, default=5)
+    args = parser.parse_args()
+
+    if not settings.MONGO_URI:
+        raise SystemExit("Set MONGO_URI to a replica set connection string")
+    connect(db=BENCH_DATABASE, host=settings.MONGO_URI)
+    try:
+        products, buyers = seed(args.concurrency, args.lines)
+        for transactional in (False, True):
+            result = run_mode(transactional, products, buyers, args.orders)
+            print(" ".join(f"{key}={value}" for key, value in result.items()))
+    finally:
+        get_db().client.drop_database(BENCH_DATABASE)
+        disconnect()
+
+if __name__ == "__main__":
+    main()
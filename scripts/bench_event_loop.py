@@ -0,0 +1,112 @@
+# Measures how product-listing queries affect the latency of unrelated
+# requests on the same worker. The app's own product router is compared with
+# the same crud call made inline in an `async def` route, which was the
+# pattern before routes went through the repository facades. Products are
+# seeded into a scratch database that is dropped afterwards.
+#
+#   MONGO_URI="mongodb://localhost:27017" python -m scripts.bench_event_loop --products 2000 --page-size 200
+import argparse
+import asyncio
+import statistics
+import time
+from decimal import Decimal
+
+import httpx
+from fastapi import FastAPI
+from mongoengine import connect, disconnect
+from mongoengine.connection import get_db
+
+from app.config import settings
+from app.crud import product_crud
+from app.models.products import Product, Category, Brand
+from app.models.users import Seller
+from app.router import product_router
+
+BENCH_DATABASE = "bench_event_loop"
+
+def seed(count: int):
+    seller = Seller(username="bench-seller", email="seller@bench.test", full_name="Bench Seller", role="seller",
+                    hashed_password="x", store_name="Bench Store", store_address="1 Bench Road").save()
+    category = Category(name="bench").save()
+    brand = Brand(name="bench").save()
+    Product.objects.insert([
+        Product(name=f"bench-{i}", price=Decimal("10.00"), stock=100, category=category, brand=brand, seller=seller)
+        for i in range(count)
+    ], load_bulk=False)
+
+def build_app():
+    app = FastAPI()
+    app.include_router(product_router.router, prefix="/api/v1/product")
+
+    @app.get("/inline/get_all_products/")
+    async def inline_products(limit: int = 50):
+        return product_crud.get_products(limit)
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+async def timed_get(client, path, samples):
+    started = time.perf_counter()
+    response = await client.get(path)
+    response.raise_for_status()
+    samples.append((time.perf_counter() - started) * 1000)
+
+async def run_mode(app, path, requests, concurrency, pings):
+    slow_samples, ping_samples = [], []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def slow():
+            async with semaphore:
+                await timed_get(client, path, slow_samples)
+
+        async def pinger():
+            for _ in range(pings):
+                await timed_get(client, "/ping", ping_samples)
+                await asyncio.sleep(0.005)
+
+        started = time.perf_counter()
+        await asyncio.gather(pinger(), *(slow() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "route": path.split("?")[0],
+        "throughput_rps": round(requests / elapsed, 1),
+        "route_p50_ms": round(statistics.median(slow_samples), 1),
+        "route_p99_ms": round(percentile(slow_samples, 0.99), 1),
+        "ping_p50_ms": round(statistics.median(ping_samples), 1),
+        "ping_p99_ms": round(percentile(ping_samples, 0.99), 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--pings", type=int, default=100)
+    args = parser.parse_args()
+
+    if not settings.MONGO_URI:
+        raise SystemExit("Set MONGO_URI to a MongoDB the benchmark may write a scratch database to")
+    connect(db=BENCH_DATABASE, host=settings.MONGO_URI)
+    try:
+        seed(args.products)
+        app = build_app()
+        for path in ("/inline/get_all_products/", "/api/v1/product/get_all_products/"):
+            result = asyncio.run(run_mode(app, f"{path}?limit={args.page_size}", args.requests, args.concurrency, args.pings))
+            print(" ".join(f"{key}={value}" for key, value in result.items()))
+    finally:
+        get_db().client.drop_database(BENCH_DATABASE)
+        disconnect()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# Measures the token checks that run at the start of every authenticated
+# request (decode + expiry + revocation) with and without the decoded-token
+# cache. Revocations use the in-memory store so no database is needed.
+#
+#   python -m scripts.bench_token_cache --tokens 100 --requests 50000
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("REVOCATION_BACKEND", "memory")
+
+from app.auth import create_access_token, decode_token, verify_token, is_token_revoked, token_cache
+
+def uncached_chain(token):
+    payload = decode_token(token)
+    return payload is not None and not is_token_revoked(token, payload)
+
+def cached_chain(token):
+    payload = verify_token(token)
+    return payload is not None and not is_token_revoked(token, payload)
+
+def run_mode(chain, tokens, requests):
+    sequence = [random.choice(tokens) for _ in range(requests)]
+    started = time.perf_counter()
+    for token in sequence:
+        if not chain(token):
+            raise RuntimeError("token rejected during benchmark")
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": chain.__name__,
+        "requests": requests,
+        "throughput_rps": round(requests / elapsed, 1),
+        "avg_us": round(elapsed / requests * 1_000_000, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=50000)
+    args = parser.parse_args()
+
+    tokens = [create_access_token({"sub": f"user{i}", "role": "buyer"}) for i in range(args.tokens)]
+    for chain in (uncached_chain, cached_chain):
+        token_cache.clear()
+        result = run_mode(chain, tokens, args.requests)
+        print(" ".join(f"{key}={value}" for key, value in result.items()))
+    print(" ".join(f"{key}={value}" for key, value in token_cache.stats().items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# Posts signed, fake Stripe checkout events to the webhook endpoint so the
+# ingestion pipeline can be load-tested without Stripe. Signatures use the
+# same scheme as Stripe (HMAC-SHA256 over "<timestamp>.<payload>") and the
+# STRIPE_WEBHOOK_SECRET the API verifies with.
+#
+#   python -m scripts.replay_stripe_events --from-pending-orders --duplicates 1
+#   python -m scripts.replay_stripe_events --session-id cs_test_123 --type checkout.session.expired
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import statistics
+import time
+import uuid
+
+import httpx
+
+from app.config import settings
+
+def build_event(session_id: str, event_type: str, payment_status: str):
+    return {
+        "id": f"evt_replay_{uuid.uuid4().hex}",
+        "object": "event",
+        "type": event_type,
+        "created": int(time.time()),
+        "data": {"object": {"id": session_id, "object": "checkout.session", "payment_status": payment_status}},
+    }
+
+def sign(payload: bytes, secret: str, timestamp: int = None) -> str:
+    timestamp = timestamp or int(time.time())
+    signature = hmac.new(secret.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+def pending_checkout_sessions(limit: int):
+    from app.database import connect_db, disconnect_db
+    from app.models.order import Order
+    connect_db()
+    try:
+        return list(Order.objects(payment_status="pending", charge__stripe_checkout_id__ne=None).limit(limit).scalar("charge__stripe_checkout_id"))
+    finally:
+        disconnect_db()
+
+async def replay(url: str, events, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    samples, statuses = [], {}
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        async def post(event):
+            payload = json.dumps(event).encode()
+            headers = {"Content-Type": "application/json", "Stripe-Signature": sign(payload, settings.STRIPE_WEBHOOK_SECRET)}
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(url, content=payload, headers=headers)
+                samples.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(post(event) for event in events))
+        elapsed = time.perf_counter() - started
+
+    ordered = sorted(samples)
+    return {
+        "events": len(events),
+        "throughput_rps": round(len(events) / elapsed, 1),
+        "p50_ms": round(statistics.median(samples), 1),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 1),
+        "statuses": statuses,
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=f"{settings.URL}/api/v1/order/stripe-webhook")
+    parser.add_argument("--session-id", action="append", default=[], help="checkout session id to replay; repeatable")
+    parser.add_argument("--from-pending-orders", action="store_true", help="replay for pending online orders in the database")
+    parser.add_argument("--fake-sessions", type=int, default=0, help="add this many events for unknown sessions")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--type", default="checkout.session.completed")
+    parser.add_argument("--payment-status", default="paid")
+    parser.add_argument("--duplicates", type=int, default=0, help="redeliver each event this many extra times")
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        raise SystemExit("Set STRIPE_WEBHOOK_SECRET to the secret the API verifies with")
+
+    session_ids = list(args.session_id)
+    if args.from_pending_orders:
+        session_ids += pending_checkout_sessions(args.limit)
+    session_ids += [f"cs_replay_{uuid.uuid4().hex}" for _ in range(args.fake_sessions)]
+    if not session_ids:
+        raise SystemExit("Nothing to replay; pass --session-id, --from-pending-orders or --fake-sessions")
+
+    events = [build_event(session_id, args.type, args.payment_status) for session_id in session_ids]
+    events = [event for event in events for _ in range(args.duplicates + 1)]
+    result = asyncio.run(replay(args.url, events, args.concurrency))
+    print(" ".join(f"{key}={value}" for key, value in result.items()))
+
+if __name__ == "__main__":
+    main()